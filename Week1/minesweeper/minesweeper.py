@@ -7,32 +7,69 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, vectorized=False):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Neighbor-count field, only precomputed for vectorized boards
+        self.counts = None
+
+        if vectorized:
+            self._init_vectorized(mines)
+        else:
+
+            # Initialize an empty field with no mines
+            self.board = []
+            for i in range(self.height):
+                row = []
+                for j in range(self.width):
+                    row.append(False)
+                self.board.append(row)
+
+            # Add mines randomly
+            while len(self.mines) != mines:
+                i = random.randrange(height)
+                j = random.randrange(width)
+                if not self.board[i][j]:
+                    self.mines.add((i, j))
+                    self.board[i][j] = True
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    def _init_vectorized(self, mines):
+        """
+        Build the board as a NumPy array, placing every mine with a single
+        permutation draw and precomputing the neighbor-count field so that
+        `nearby_mines` becomes a lookup.
+        """
+        import numpy as np
+
+        if mines > self.height * self.width:
+            raise ValueError(
+                f"cannot place {mines} mines on a "
+                f"{self.height}x{self.width} board"
+            )
+        rng = np.random.default_rng(random.getrandbits(64))
+        cells = rng.permutation(self.height * self.width)[:mines]
+        self.board = np.zeros((self.height, self.width), dtype=bool)
+        self.board.flat[cells] = True
+        rows, cols = np.divmod(cells, self.width)
+        self.mines = set(zip(rows.tolist(), cols.tolist()))
+
+        # Sum the eight shifted copies of the padded board
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        counts = np.zeros((self.height, self.width), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if di == 1 and dj == 1:
+                    continue
+                counts += padded[di:di + self.height, dj:dj + self.width]
+        self.counts = counts
+
     def print(self):
         """
         Prints a text-based representation
@@ -50,7 +87,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i][j])
 
     def nearby_mines(self, cell):
         """
@@ -58,6 +95,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        if self.counts is not None:
+            return int(self.counts[cell])
 
         # Keep count of nearby mines
         count = 0
@@ -77,6 +116,37 @@ class Minesweeper():
 
         return count
 
+    def reveal(self, cell, revealed=(), flags=()):
+        """
+        Reveals a safe cell and, whenever a revealed cell has no
+        neighboring mines, flood-fills into its neighbors.
+
+        Returns a list of (cell, count) observations for every newly
+        revealed cell, skipping cells already in `revealed`. The flood
+        fill never opens cells the player has flagged in `flags`.
+        """
+        observations = []
+        seen = {cell}
+        frontier = [cell]
+        while frontier:
+            current = frontier.pop()
+            if current in revealed or (current != cell and current in flags):
+                continue
+            count = self.nearby_mines(current)
+            observations.append((current, count))
+            if count != 0:
+                continue
+
+            # No neighbor can be a mine, so all of them are safe to reveal
+            for i in range(current[0] - 1, current[0] + 2):
+                for j in range(current[1] - 1, current[1] + 2):
+                    if 0 <= i < self.height and 0 <= j < self.width:
+                        if (i, j) not in seen:
+                            seen.add((i, j))
+                            frontier.append((i, j))
+
+        return observations
+
     def won(self):
         """
         Checks if all mines have been flagged.
@@ -209,6 +279,27 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        self.learn(cell, count)
+        self.infer()
+
+    def add_knowledge_batch(self, observations):
+        """
+        Called with many (cell, count) observations at once, for example
+        every cell opened by a flood-filled reveal.
+
+        Every observation is recorded as in `add_knowledge`, but inference
+        over the knowledge base only runs once, after the whole batch.
+        """
+        for cell, count in observations:
+            self.learn(cell, count)
+        self.infer()
+
+    def learn(self, cell, count):
+        """
+        Records a single observation without running inference:
+        marks the cell as a safe move and adds its sentence to the
+        knowledge base.
+        """
         # mark the cell as a move that has been made
         self.moves_made.add(cell)
         # mark the cell as safe
@@ -232,6 +323,11 @@ class MinesweeperAI():
         for mine in self.mines:
             next_sentence.mark_mine(mine)
 
+    def infer(self):
+        """
+        Marks additional mines and safes and adds inferred sentences
+        until the knowledge base no longer changes.
+        """
         continuing = True
         while continuing:
             # mark any additional cells as safe or as mines
@@ -215,8 +215,8 @@ while True:
         if game.is_mine(move):
             lost = True
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            observations = game.reveal(move, revealed, flags)
+            revealed.update(cell for cell, _ in observations)
+            ai.add_knowledge_batch(observations)
 
     pygame.display.flip()
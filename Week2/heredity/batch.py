@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from heredity import APPROXIMATE_METHODS, METHODS, load_data, split_pedigrees
+
+VALUES = ["gene_2", "gene_1", "gene_0", "trait_true", "trait_false"]
+FIELDS = ["file", "family", "person"] + VALUES
+ERROR_FIELDS = [f"{field}_error" for field in VALUES]
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python batch.py source output [method] [workers]")
+    source, output = sys.argv[1], sys.argv[2]
+    method = sys.argv[3] if len(sys.argv) >= 4 else "elimination"
+    workers = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    if method not in METHODS and method not in APPROXIMATE_METHODS:
+        methods = list(METHODS) + list(APPROXIMATE_METHODS)
+        sys.exit(f"Unknown method, choose from: {', '.join(methods)}")
+    run_batch(source, output, method, workers)
+
+
+def family_files(source):
+    """
+    Return the CSV files to process: every CSV in `source` if it is a
+    directory, otherwise the files listed one per line in the manifest
+    `source`, relative to the manifest's directory.
+    """
+    if os.path.isdir(source):
+        return [
+            os.path.join(source, filename)
+            for filename in sorted(os.listdir(source))
+            if filename.endswith(".csv")
+        ]
+    root = os.path.dirname(source)
+    with open(source) as f:
+        return [os.path.join(root, line.strip()) for line in f if line.strip()]
+
+
+def infer_file(task):
+    """
+    Load one CSV, split it into independent families and run the
+    inference method on each. Return one output row per person, with
+    standard errors for approximate methods.
+    """
+    filename, method = task
+    rows = []
+    for k, people in enumerate(split_pedigrees(load_data(filename))):
+        if method in METHODS:
+            probabilities, errors = METHODS[method](people), None
+        else:
+            probabilities, errors = APPROXIMATE_METHODS[method](people)
+        for person in people:
+            row = {"file": filename, "family": k, "person": person}
+            row.update(zip(VALUES, values(probabilities[person])))
+            if errors is not None:
+                row.update(zip(ERROR_FIELDS, values(errors[person])))
+            rows.append(row)
+    return rows
+
+
+def values(distributions):
+    """
+    Return a person's gene and trait values in `VALUES` order.
+    """
+    gene = distributions["gene"]
+    trait = distributions["trait"]
+    return [gene[2], gene[1], gene[0], trait[True], trait[False]]
+
+
+def run_batch(source, output, method="elimination", workers=None):
+    """
+    Run inference on every family of every CSV in `source` on a pool of
+    `workers` processes, streaming one row per person to `output` as
+    they complete. `output` is written as CSV if its name ends in
+    ".csv", and as JSON lines otherwise.
+    """
+    tasks = [(filename, method) for filename in family_files(source)]
+    workers = workers or os.cpu_count() or 1
+
+    # Hand out files in chunks so process overhead is paid per chunk
+    chunksize = max(1, len(tasks) // (workers * 16))
+    with open(output, "w", newline="") as f, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        if output.endswith(".csv"):
+            fields = FIELDS
+            if method in APPROXIMATE_METHODS:
+                fields = FIELDS + ERROR_FIELDS
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(row):
+                f.write(json.dumps(row) + "\n")
+
+        for rows in executor.map(infer_file, tasks, chunksize=chunksize):
+            for row in rows:
+                write(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -36,15 +36,60 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible numbers of copies of the gene
+GENES = (0, 1, 2)
+
+# Defaults for approximate inference
+SAMPLES = 100000
+BATCH_SIZE = 10000
+CHAINS = 100
+BURN_IN = 100
+
+# Effective sample size below which likelihood weighting inflates its
+# standard errors, which are unreliable with so few effective samples
+MIN_EFFECTIVE_SAMPLES = 1000
+
+# Largest family `tensor_probabilities` builds the joint distribution of
+JOINT_PEOPLE = 10
+
 
 def main():
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python heredity.py data.csv [method]")
     people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) == 3 else "elimination"
+    if method not in METHODS and method not in APPROXIMATE_METHODS:
+        methods = list(METHODS) + list(APPROXIMATE_METHODS)
+        sys.exit(f"Unknown method, choose from: {', '.join(methods)}")
+
+    # Compute gene and trait probabilities for each person
+    errors = None
+    if method in METHODS:
+        probabilities = METHODS[method](people)
+    else:
+        probabilities, errors = APPROXIMATE_METHODS[method](people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    error = errors[person][field][value]
+                    print(f"    {value}: {p:.4f} ± {error:.4f}")
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+
+def empty_probabilities(people):
+    """
+    Return a gene and trait probability table for each person,
+    with every entry set to 0.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -59,37 +104,111 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+def enumerate_probabilities(people):
+    """
+    Compute every person's gene and trait distribution by enumerating
+    all joint assignments of gene counts.
+
+    Assignments are visited with a mixed-radix counter over everyone's
+    gene count, parents before children, keeping running products of
+    each person's factor so that advancing the counter only recomputes
+    the people whose digit changed and those after them. Observed traits
+    weight each assignment; unobserved traits are summed out exactly
+    from the gene distributions at the end.
+    """
+    order = parents_first(people)
+    index = {person: i for i, person in enumerate(order)}
+    n = len(order)
+    parents = [
+        None if people[person]["father"] is None else
+        (index[people[person]["father"]], index[people[person]["mother"]])
+        for person in order
+    ]
+    tables = probability_tables()
+    evidence = [
+        [1 if people[person]["trait"] is None else
+         tables["trait"][g][people[person]["trait"]] for g in GENES]
+        for person in order
+    ]
+    prior = tables["gene"]
+    inherit = tables["inherit"]
+
+    genes = [0] * n
+    prefix = [1.0] * (n + 1)
+    totals = [[0.0] * len(GENES) for _ in range(n)]
+    changed = 0
+    while True:
+
+        # Recompute running products from the first changed digit on
+        for i in range(changed, n):
+            g = genes[i]
+            if parents[i] is None:
+                p = prior[g]
+            else:
+                father, mother = parents[i]
+                p = inherit[g][genes[father]][genes[mother]]
+            prefix[i + 1] = prefix[i] * p * evidence[i][g]
+
+        p = prefix[n]
+        for i in range(n):
+            totals[i][genes[i]] += p
+
+        # Advance the counter, last person fastest
+        changed = n - 1
+        while changed >= 0 and genes[changed] == GENES[-1]:
+            genes[changed] = 0
+            changed -= 1
+        if changed < 0:
+            break
+        genes[changed] += 1
+
+    probabilities = empty_probabilities(people)
+    for person, i in index.items():
+        set_marginals(probabilities, people, person, totals[i])
+    return probabilities
+
+
+def set_marginals(probabilities, people, person, weights):
+    """
+    Fill in `person`'s distributions in `probabilities` from unnormalized
+    `weights` of each gene count. The trait distribution is the observed
+    trait if there is one, and follows from the gene distribution
+    otherwise.
+    """
+    total = sum(weights)
+    trait = people[person]["trait"]
+    trait_table = probability_tables()["trait"]
+    for g in GENES:
+        p = weights[g] / total
+        probabilities[person]["gene"][g] = p
+        for t in (True, False):
+            probabilities[person]["trait"][t] += (
+                p * trait_table[g][t] if trait is None else
+                p * (t == trait)
+            )
+
+
+def parents_first(people):
+    """
+    Return everyone's name, ordered so that parents come before
+    their children.
+    """
+    order = []
+    placed = set()
+
+    def place(person):
+        if person in placed:
+            return
+        placed.add(person)
+        for parent in (people[person]["father"], people[person]["mother"]):
+            if parent is not None:
+                place(parent)
+        order.append(person)
 
-    # Print results
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        place(person)
+    return order
 
 
 def load_data(filename):
@@ -114,16 +233,39 @@ def load_data(filename):
     return data
 
 
+def split_pedigrees(people):
+    """
+    Split `people` into independent families, connected through parent
+    links. Return a list of dictionaries in the format of `load_data`.
+    """
+    family = {person: person for person in people}
+
+    def find(person):
+        while family[person] != person:
+            family[person] = family[family[person]]
+            person = family[person]
+        return person
+
+    for person, data in people.items():
+        for parent in (data["mother"], data["father"]):
+            if parent is not None:
+                family[find(parent)] = find(person)
+
+    pedigrees = {}
+    for person, data in people.items():
+        pedigrees.setdefault(find(person), {})[person] = data
+    return list(pedigrees.values())
+
+
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Lazily yield all possible subsets of set s.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 
 def genes_and_traits(people, one_gene, two_genes, have_trait):
@@ -153,26 +295,62 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     """
     # 初始化
     genes, traits = genes_and_traits(set(people.keys()), one_gene, two_genes, have_trait)
+    tables = probability_tables()
     prob_genes = {}  # key: name value: 有指定条基因的概率
     remains = set(people.keys())  # 存储还未计算的集合
 
     for p in remains:
         if people[p]["mother"] is None and people[p]["father"] is None:
             # 没有父母 可以直接算
-            prob_genes[p] = PROBS["gene"][genes[p]]
+            prob_genes[p] = tables["gene"][genes[p]]
         else:
             father = people[p]["father"]
             mother = people[p]["mother"]
             p_gene = genes[p]  # p有的基因条数
-            prob_genes[p] = prob_of_child_genes(p_gene, genes[father], genes[mother])
+            prob_genes[p] = tables["inherit"][p_gene][genes[father]][genes[mother]]
     product = 1
     for prob in prob_genes.values():
         product *= prob
     for (p, t) in traits.items():
-        product *= PROBS["trait"][genes[p]][t]
+        product *= tables["trait"][genes[p]][t]
     return product
 
 
+def probability_tables():
+    """
+    Return lookup tables for the current `PROBS`, built once and rebuilt
+    only when `PROBS` changes:
+        * "gene": P(gene) by gene count, for people without parents
+        * "inherit": P(child gene | father gene, mother gene),
+          indexed [child][father][mother]
+        * "trait": P(trait | gene), indexed [gene][trait], where a
+          trait of False or True indexes 0 or 1
+    """
+    key = (
+        PROBS["mutation"],
+        tuple(PROBS["gene"][g] for g in GENES),
+        tuple(PROBS["trait"][g][t] for g in GENES for t in (False, True))
+    )
+    if _tables.get("key") != key:
+        _tables["key"] = key
+        _tables["gene"] = tuple(PROBS["gene"][g] for g in GENES)
+        _tables["inherit"] = tuple(
+            tuple(
+                tuple(prob_of_child_genes(g, f, m) for m in GENES)
+                for f in GENES
+            )
+            for g in GENES
+        )
+        _tables["trait"] = tuple(
+            (PROBS["trait"][g][False], PROBS["trait"][g][True]) for g in GENES
+        )
+    return _tables
+
+
+# Cache of the tables built by `probability_tables`
+_tables = {}
+
+
 def prob_of_child_genes(child_gene, father_gene, mother_gene):
     if child_gene == 0:
         # father 0 mom 0
@@ -246,5 +424,463 @@ def normalize(probabilities):
             probabilities[p][category] = new_dict
 
 
+class Factor():
+    """
+    Table of non-negative values over joint gene counts of some people.
+    `scope` is a tuple of names and `table` maps each tuple of gene
+    counts (in scope order) to a value; `tensor_probabilities` uses NumPy
+    arrays, indexed the same way, as tables.
+    """
+
+    def __init__(self, scope, table):
+        self.scope = tuple(scope)
+        self.table = table
+
+    def __mul__(self, other):
+        scope = self.scope + tuple(v for v in other.scope if v not in self.scope)
+        positions = [scope.index(v) for v in other.scope]
+        table = {}
+        for values in itertools.product(GENES, repeat=len(scope)):
+            other_values = tuple(values[i] for i in positions)
+            table[values] = (self.table[values[:len(self.scope)]]
+                             * other.table[other_values])
+        return Factor(scope, table)
+
+    def marginal(self, keep):
+        """
+        Return the factor summed over every name not in `keep`.
+        """
+        scope = tuple(v for v in self.scope if v in keep)
+        positions = [self.scope.index(v) for v in scope]
+        table = dict.fromkeys(itertools.product(GENES, repeat=len(scope)), 0)
+        for values, p in self.table.items():
+            table[tuple(values[i] for i in positions)] += p
+        return Factor(scope, table)
+
+
+UNIT = Factor((), {(): 1})
+
+
+def gene_factors(people):
+    """
+    Return the factors of the gene and observed trait model for each
+    person: P(gene | parents' genes) times P(observed trait | gene).
+    """
+    tables = probability_tables()
+    factors = {}
+    for person, data in people.items():
+        if data["mother"] is None and data["father"] is None:
+            scope = (person,)
+            table = {(g,): tables["gene"][g] for g in GENES}
+        else:
+            scope = (person, data["father"], data["mother"])
+            table = {
+                (g, f, m): tables["inherit"][g][f][m]
+                for g, f, m in itertools.product(GENES, repeat=3)
+            }
+        factor = Factor(scope, table)
+        if data["trait"] is not None:
+            factor = factor * Factor((person,), {
+                (g,): tables["trait"][g][data["trait"]] for g in GENES
+            })
+        factors[person] = factor
+    return factors
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate everyone, greedily picking the
+    person whose elimination adds the fewest new interactions (fill-in),
+    breaking ties by fewest neighbors.
+    """
+    neighbors = {person: set() for person in factors}
+    for factor in factors.values():
+        for person in factor.scope:
+            neighbors[person].update(factor.scope)
+            neighbors[person].discard(person)
+
+    order = []
+    while neighbors:
+        def cost(person):
+            adjacent = neighbors[person]
+            fill = sum(
+                1 for a, b in itertools.combinations(adjacent, 2)
+                if b not in neighbors[a]
+            )
+            return fill, len(adjacent)
+
+        person = min(neighbors, key=cost)
+        adjacent = neighbors.pop(person)
+        for a in adjacent:
+            neighbors[a].discard(person)
+            neighbors[a].update(adjacent - {a})
+        order.append(person)
+    return order
+
+
+def eliminate_probabilities(people):
+    """
+    Compute every person's gene and trait distribution exactly by
+    variable elimination, calibrating the bucket tree of a greedy
+    elimination order so that all marginals come out of one upward and
+    one downward pass.
+    """
+    factors = gene_factors(people)
+    order = elimination_order(factors)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Each factor goes to the bucket of its first eliminated person
+    buckets = {person: UNIT for person in order}
+    for factor in factors.values():
+        first = min(factor.scope, key=position.get)
+        buckets[first] = buckets[first] * factor
+
+    # Upward pass: each bucket sends its sum over its own person to the
+    # bucket of the next person to be eliminated from what remains
+    parent = {}
+    children = {person: [] for person in order}
+    upward = {}
+    for person in order:
+        belief = buckets[person]
+        for child in children[person]:
+            belief = belief * upward[child]
+        separator = set(belief.scope) - {person}
+        if separator:
+            parent[person] = min(separator, key=position.get)
+            children[parent[person]].append(person)
+        upward[person] = belief.marginal(separator)
+
+    # Downward pass and marginals, starting from the roots
+    downward = {}
+    probabilities = empty_probabilities(people)
+    for person in reversed(order):
+        belief = buckets[person]
+        if person in downward:
+            belief = belief * downward[person]
+        incoming = {child: upward[child] for child in children[person]}
+        for message in incoming.values():
+            belief = belief * message
+        for child in children[person]:
+            outgoing = buckets[person]
+            if person in downward:
+                outgoing = outgoing * downward[person]
+            for other, message in incoming.items():
+                if other != child:
+                    outgoing = outgoing * message
+            downward[child] = outgoing.marginal(upward[child].scope)
+
+        gene = belief.marginal({person}).table
+        weights = [gene[(g,)] for g in GENES]
+        set_marginals(probabilities, people, person, weights)
+    return probabilities
+
+
+def tensor_probabilities(people):
+    """
+    Compute every person's gene and trait distribution with NumPy.
+
+    Each person contributes one conditional probability table, over their
+    own gene count and their parents', weighted by their observed trait.
+    A family of at most `JOINT_PEOPLE` people is contracted once into its
+    joint distribution, which every marginal is summed from. Larger
+    families are calibrated like `eliminate_probabilities`, with one
+    `numpy.einsum` per message along the bucket tree, so the joint
+    distribution over everyone (3^n entries) is never built.
+    """
+    import numpy as np
+
+    tables = probability_tables()
+    prior = np.array(tables["gene"])
+    inherit = np.array(tables["inherit"])
+    trait = np.array(tables["trait"])
+
+    probabilities = empty_probabilities(people)
+    for family in split_pedigrees(people):
+        factors = {}
+        for person, data in family.items():
+            evidence = np.ones(len(GENES))
+            if data["trait"] is not None:
+                evidence = trait[:, int(data["trait"])]
+            if data["father"] is None:
+                factors[person] = Factor((person,), prior * evidence)
+            else:
+                factors[person] = Factor(
+                    (person, data["father"], data["mother"]),
+                    inherit * evidence[:, None, None]
+                )
+
+        if len(family) <= JOINT_PEOPLE:
+            joint = contract(factors.values(), family, optimize=True)
+            for i, person in enumerate(joint.scope):
+                others = tuple(k for k in range(len(joint.scope)) if k != i)
+                weights = joint.table.sum(axis=others).tolist()
+                set_marginals(probabilities, family, person, weights)
+            continue
+
+        order = elimination_order(factors)
+        position = {person: i for i, person in enumerate(order)}
+        buckets = {person: [] for person in order}
+        for factor in factors.values():
+            buckets[min(factor.scope, key=position.get)].append(factor)
+
+        # Upward pass, as in `eliminate_probabilities`
+        children = {person: [] for person in order}
+        upward = {}
+        for person in order:
+            bucket = buckets[person] + [upward[child] for child in children[person]]
+            separator = {v for factor in bucket for v in factor.scope} - {person}
+            if separator:
+                children[min(separator, key=position.get)].append(person)
+            upward[person] = contract(bucket, separator)
+
+        # Downward pass and marginals, starting from the roots
+        downward = {}
+        for person in reversed(order):
+            bucket = buckets[person] + (
+                [downward[person]] if person in downward else []
+            )
+            incoming = {child: upward[child] for child in children[person]}
+            for child in children[person]:
+                others = [m for other, m in incoming.items() if other != child]
+                downward[child] = contract(bucket + others, upward[child].scope)
+            belief = contract(bucket + list(incoming.values()), {person})
+            set_marginals(probabilities, family, person, belief.table.tolist())
+    return probabilities
+
+
+def contract(factors, keep, optimize=False):
+    """
+    Multiply `factors`, whose tables are NumPy arrays, and sum out
+    everyone not in `keep` with one `numpy.einsum`. No factors multiply
+    to one.
+    """
+    import numpy as np
+
+    if not factors:
+        return Factor((), np.ones(()))
+    labels = {}
+    operands = []
+    for factor in factors:
+        operands += [
+            factor.table, [labels.setdefault(v, len(labels)) for v in factor.scope]
+        ]
+    scope = tuple(v for v in labels if v in keep)
+    return Factor(scope, np.einsum(*operands, [labels[v] for v in scope],
+                                   optimize=optimize))
+
+
+def elimination_cost(people):
+    """
+    Return the number of table entries `eliminate_probabilities` builds
+    for `people` (the sum of 3^k over its clusters of k people), to
+    help decide between exact and approximate inference.
+    """
+    factors = gene_factors(people)
+    order = elimination_order(factors)
+    position = {person: i for i, person in enumerate(order)}
+    scopes = {person: {person} for person in order}
+    for factor in factors.values():
+        scopes[min(factor.scope, key=position.get)].update(factor.scope)
+
+    cost = 0
+    for person in order:
+        cost += len(GENES) ** len(scopes[person])
+        separator = scopes[person] - {person}
+        if separator:
+            scopes[min(separator, key=position.get)].update(separator)
+    return cost
+
+
+def sampling_tables(people):
+    """
+    Return the NumPy arrays shared by the samplers: everyone's name
+    (parents first), each person's parents' positions (-1 for none),
+    the gene prior, the inheritance table, and the weight of each gene
+    count given each person's observed trait (1 if unobserved).
+    """
+    import numpy as np
+
+    order = parents_first(people)
+    index = {person: i for i, person in enumerate(order)}
+    parents = np.array([
+        (-1, -1) if people[person]["father"] is None else
+        (index[people[person]["father"]], index[people[person]["mother"]])
+        for person in order
+    ], dtype=np.int64).reshape(-1, 2)
+    tables = probability_tables()
+    trait = np.array(tables["trait"])
+    evidence = np.ones((len(order), len(GENES)))
+    for i, person in enumerate(order):
+        if people[person]["trait"] is not None:
+            evidence[i] = trait[:, int(people[person]["trait"])]
+    return (order, parents, np.array(tables["gene"]),
+            np.array(tables["inherit"]), evidence)
+
+
+def draw(rng, distributions):
+    """
+    Draw one gene count per column of `distributions`, an array of
+    shape (3, samples) whose columns sum to 1.
+    """
+    cumulative = distributions.cumsum(axis=0)
+    u = rng.random(distributions.shape[1]) * cumulative[-1]
+    return (u > cumulative[0]).astype(int) + (u > cumulative[1])
+
+
+def estimates(people, order, gene_weights, gene_errors, trait_errors):
+    """
+    Build the probability and error tables returned by the samplers
+    from per-person gene weights and standard errors.
+    """
+    probabilities = empty_probabilities(people)
+    errors = empty_probabilities(people)
+    for i, person in enumerate(order):
+        set_marginals(probabilities, people, person, gene_weights[i].tolist())
+        for g in GENES:
+            errors[person]["gene"][g] = float(gene_errors[i, g])
+        if people[person]["trait"] is None:
+            for t in (True, False):
+                errors[person]["trait"][t] = float(trait_errors[i])
+    return probabilities, errors
+
+
+def likelihood_weighting(people, samples=SAMPLES, seed=None,
+                         batch_size=BATCH_SIZE):
+    """
+    Estimate every person's gene and trait distribution by likelihood
+    weighting: gene counts are sampled parents first in batches of
+    `batch_size`, and each sample is weighted by the probability of the
+    observed traits. Unobserved traits are averaged exactly given the
+    sampled genes. With many observed traits the weights degenerate and
+    `gibbs_sampling` is usually the better choice.
+
+    Return `(probabilities, errors)`, where `errors` holds the standard
+    error of each estimate in the same format. When the effective sample
+    size (sum of weights)^2 / (sum of squared weights) is below
+    `MIN_EFFECTIVE_SAMPLES`, the few heavy samples that dominate the
+    estimates also make their standard errors overconfident, so errors
+    are scaled up by sqrt(`MIN_EFFECTIVE_SAMPLES` / effective size).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    order, parents, prior, inherit, evidence = sampling_tables(people)
+    n = len(order)
+    weight_sums = np.zeros((n, len(GENES)))
+    square_sums = np.zeros((n, len(GENES)))
+
+    for start in range(0, samples, batch_size):
+        size = min(batch_size, samples - start)
+        genes = np.empty((n, size), dtype=np.int64)
+        weights = np.ones(size)
+        for i in range(n):
+            father, mother = parents[i]
+            if father < 0:
+                genes[i] = rng.choice(len(GENES), size=size, p=prior)
+            else:
+                genes[i] = draw(rng, inherit[:, genes[father], genes[mother]])
+            weights *= evidence[i, genes[i]]
+        for i in range(n):
+            weight_sums[i] += np.bincount(genes[i], weights, len(GENES))
+            square_sums[i] += np.bincount(genes[i], weights ** 2, len(GENES))
+
+    # Standard error of each self-normalized (ratio) estimate, and no less
+    # than that of an unweighted estimate from the effective sample size,
+    # which keeps rare gene counts that heavy samples missed from
+    # getting tiny errors
+    total = weight_sums[0].sum()
+    squares = square_sums[0].sum()
+    effective = total ** 2 / squares
+    p = weight_sums / total
+    gene_errors = np.maximum(
+        np.sqrt(square_sums * (1 - p) ** 2 + (squares - square_sums) * p ** 2)
+        / total,
+        np.sqrt(p * (1 - p) / effective)
+    )
+    chance = np.array(probability_tables()["trait"])[:, 1]
+    spread = (chance - (p @ chance)[:, None]) ** 2
+    trait_errors = np.maximum(
+        np.sqrt((square_sums * spread).sum(axis=1)) / total,
+        np.sqrt((p * spread).sum(axis=1) / effective)
+    )
+    inflation = np.sqrt(max(1, MIN_EFFECTIVE_SAMPLES / effective))
+    return estimates(people, order, weight_sums,
+                     gene_errors * inflation, trait_errors * inflation)
+
+
+def gibbs_sampling(people, samples=SAMPLES, burn_in=BURN_IN, chains=CHAINS,
+                   seed=None):
+    """
+    Estimate every person's gene and trait distribution by Gibbs
+    sampling `chains` independent chains at once. Each sweep resamples
+    every person's gene count given their parents', their children's
+    and their observed trait; the first `burn_in` sweeps are discarded
+    and enough sweeps follow to collect `samples` samples in total.
+    Unobserved traits are averaged exactly given the sampled genes.
+
+    Return `(probabilities, errors)`, where `errors` holds the standard
+    error of each estimate in the same format, measured by the spread
+    between chains.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    order, parents, prior, inherit, evidence = sampling_tables(people)
+    n = len(order)
+    children = [np.flatnonzero((parents == i).any(axis=1)) for i in range(n)]
+    founders = parents[:, 0] < 0
+
+    # Start every chain from a forward sample of the gene model
+    genes = np.empty((n, chains), dtype=np.int64)
+    for i in range(n):
+        father, mother = parents[i]
+        if founders[i]:
+            genes[i] = rng.choice(len(GENES), size=chains, p=prior)
+        else:
+            genes[i] = draw(rng, inherit[:, genes[father], genes[mother]])
+
+    sweeps = -(-samples // chains)
+    counts = np.zeros((n, chains, len(GENES)))
+    options = np.arange(len(GENES))[:, None]
+    for sweep in range(burn_in + sweeps):
+        for i in range(n):
+            father, mother = parents[i]
+            if founders[i]:
+                weights = np.repeat(prior[:, None], chains, axis=1)
+            else:
+                weights = inherit[:, genes[father], genes[mother]]
+            weights = weights * evidence[i][:, None]
+            for child in children[i]:
+                child_father, child_mother = parents[child]
+                if child_father == i:
+                    weights *= inherit[genes[child], options, genes[child_mother]]
+                else:
+                    weights *= inherit[genes[child], genes[child_father], options]
+            genes[i] = draw(rng, weights / weights.sum(axis=0))
+        if sweep >= burn_in:
+            for g in GENES:
+                counts[:, :, g] += genes == g
+
+    # Per-chain estimates, and their spread across chains
+    fractions = counts / sweeps
+    chance = np.array(probability_tables()["trait"])[:, 1]
+    spread = np.sqrt(chains) if chains > 1 else np.nan
+    gene_errors = fractions.std(axis=1, ddof=min(1, chains - 1)) / spread
+    trait_errors = (fractions @ chance).std(axis=1, ddof=min(1, chains - 1)) / spread
+    return estimates(people, order, fractions.sum(axis=1), gene_errors, trait_errors)
+
+
+METHODS = {
+    "elimination": eliminate_probabilities,
+    "enumeration": enumerate_probabilities,
+    "tensor": tensor_probabilities,
+}
+
+APPROXIMATE_METHODS = {
+    "likelihood-weighting": likelihood_weighting,
+    "gibbs": gibbs_sampling,
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,151 @@
+import random
+
+import numpy
+import pytest
+
+import heredity
+
+
+def random_family(seed, size, founders=2, generation=6, observed=0.5):
+    """
+    Return `size` people in the format of `load_data`, the first
+    `founders` without parents and each other with two parents among the
+    `generation` people before them, with each trait observed with
+    probability `observed`.
+    """
+    rng = random.Random(seed)
+    people = {}
+    for i in range(size):
+        mother = father = None
+        if i >= founders:
+            mother, father = (f"P{k}" for k in rng.sample(range(max(0, i - generation), i), 2))
+        trait = rng.choice([True, False]) if rng.random() < observed else None
+        people[f"P{i}"] = {
+            "name": f"P{i}", "mother": mother, "father": father, "trait": trait
+        }
+    return people
+
+
+def assert_close(probabilities, expected, tolerance=1e-9):
+    for person in expected:
+        for field in expected[person]:
+            for value, p in expected[person][field].items():
+                assert probabilities[person][field][value] == pytest.approx(
+                    p, abs=tolerance
+                )
+
+
+def brute_force(people):
+    """
+    Compute every person's distributions by summing the joint probability
+    of every assignment consistent with the observed traits.
+    """
+    probabilities = heredity.empty_probabilities(people)
+    names = set(people)
+    for have_trait in heredity.powerset(names):
+        if any(
+            people[person]["trait"] is not None
+            and people[person]["trait"] != (person in have_trait)
+            for person in names
+        ):
+            continue
+        for one_gene in heredity.powerset(names):
+            for two_genes in heredity.powerset(names - one_gene):
+                p = heredity.joint_probability(
+                    people, one_gene, two_genes, have_trait
+                )
+                heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+    heredity.normalize(probabilities)
+    return probabilities
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("method", [
+    heredity.eliminate_probabilities, heredity.enumerate_probabilities
+])
+def test_exact_inference_matches_brute_force(method, seed):
+    people = random_family(seed, 3 + seed % 3, founders=2 + seed % 2)
+    assert_close(method(people), brute_force(people), 1e-12)
+
+
+def test_tensor_handles_more_people_than_einsum_labels():
+    people = {
+        f"P{i}": {
+            "name": f"P{i}", "mother": None, "father": None,
+            "trait": None if i % 3 == 0 else bool(i % 2)
+        }
+        for i in range(53)
+    }
+    assert_close(
+        heredity.tensor_probabilities(people),
+        heredity.eliminate_probabilities(people)
+    )
+
+
+@pytest.mark.parametrize("size", [4, heredity.JOINT_PEOPLE, 30, 53, 80])
+def test_tensor_matches_elimination(size):
+    people = random_family(size, size)
+    assert len(heredity.split_pedigrees(people)) == 1
+    assert_close(
+        heredity.tensor_probabilities(people),
+        heredity.eliminate_probabilities(people)
+    )
+
+
+def test_tensor_contracts_each_family_a_bounded_number_of_times(monkeypatch):
+    calls = []
+    einsum = numpy.einsum
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs.get("optimize"))
+        return einsum(*args, **kwargs)
+
+    monkeypatch.setattr(numpy, "einsum", counting)
+
+    # A small family is contracted once into its joint distribution
+    heredity.tensor_probabilities(random_family(0, heredity.JOINT_PEOPLE))
+    assert len(calls) == 1
+
+    # A large one sends two messages and takes one marginal per person,
+    # none of which needs a contraction path search
+    calls.clear()
+    heredity.tensor_probabilities(random_family(0, 60))
+    assert len(calls) <= 3 * 60
+    assert not any(calls)
+
+
+def z_scores(people, method, seeds, **kwargs):
+    exact = heredity.eliminate_probabilities(people)
+    scores = []
+    for seed in range(seeds):
+        probabilities, errors = method(people, seed=seed, **kwargs)
+        for person in people:
+            for g in heredity.GENES:
+                error = (probabilities[person]["gene"][g]
+                         - exact[person]["gene"][g])
+                scores.append(error / errors[person]["gene"][g])
+    return numpy.array(scores)
+
+
+def test_likelihood_weighting_errors_cover_rare_observed_traits():
+    # Four rare traits observed leave an effective sample size of ~25
+    people = {
+        "F": {"name": "F", "mother": None, "father": None, "trait": True},
+        "M": {"name": "M", "mother": None, "father": None, "trait": True},
+        "A": {"name": "A", "mother": "M", "father": "F", "trait": True},
+        "S": {"name": "S", "mother": None, "father": None, "trait": True},
+        "C": {"name": "C", "mother": "A", "father": "S", "trait": None},
+    }
+    scores = z_scores(people, heredity.likelihood_weighting, 20, samples=100000)
+    assert numpy.abs(scores).max() < 3
+    assert scores.std() < 1.2
+
+
+def test_likelihood_weighting_errors_are_calibrated():
+    # With one rare trait observed the effective sample size stays large,
+    # so errors should be neither too small nor inflated
+    people = random_family(1, 6, observed=0)
+    people["P1"]["trait"] = False
+    people["P4"]["trait"] = True
+    scores = z_scores(people, heredity.likelihood_weighting, 20, samples=20000)
+    assert 0.7 < scores.std() < 1.3
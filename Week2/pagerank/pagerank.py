@@ -1,10 +1,31 @@
+import json
 import os
-import random
 import re
 import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
 
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 1e-6
+AITKEN_PERIOD = 10
+WALKERS = 100
+VISIT_BUFFER = 1 << 22
+CHUNK_SIZE = 1 << 16
+BLOCK_EDGES = 1 << 22
+EDGE_DTYPE = np.dtype([("source", "<u4"), ("target", "<u4")])
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Start of a link tag that runs into the end of a chunk unfinished, so
+# `LINK_PATTERN` could still match it once the next chunk is read
+PARTIAL_LINK_PATTERN = re.compile(
+    r"<(?:a(?:\s+[^>]*)?)?\Z|<a\s+[^>]*?href=\"[^\"]*\Z"
+)
 
 
 def main():
@@ -21,22 +42,15 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, workers=None, cache=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    `workers` and `cache` are passed on to `iter_links`.
+    """
+    pages = dict(iter_links(directory, workers, cache))
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -48,6 +62,162 @@ def crawl(directory):
     return pages
 
 
+def iter_links(directory, workers=None, cache=None):
+    """
+    Yield `(page, links)` for every HTML page in `directory`, where
+    `links` is the set of other pages the page links to (whether or not
+    they are in the corpus).
+
+    Pages are parsed on a pool of `workers` processes when `workers` is
+    more than 1. If `cache` names a JSON file, links of pages whose size
+    and modification time are unchanged since the last crawl are read
+    from it instead of being parsed again, and the file is rewritten once
+    every page has been yielded.
+    """
+    entries = load_link_cache(cache) if cache else {}
+    fresh = {} if cache else None
+    stale = []
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".html"):
+            continue
+        stat = os.stat(os.path.join(directory, filename))
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = entries.get(filename)
+        if entry is not None and entry[:2] == key:
+            fresh[filename] = entry
+            yield filename, set(entry[2]) - {filename}
+        else:
+            stale.append((filename, key))
+
+    paths = [os.path.join(directory, filename) for filename, _ in stale]
+    if workers is not None and workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(paths) // (workers * 16))
+            results = executor.map(parse_links, paths, chunksize=chunksize)
+            yield from _record_links(stale, results, fresh)
+    else:
+        yield from _record_links(stale, map(parse_links, paths), fresh)
+
+    if cache:
+        save_link_cache(cache, fresh)
+
+
+def _record_links(stale, results, fresh):
+    """
+    Yield freshly parsed links, recording them as new cache entries
+    unless `fresh` is None.
+    """
+    for (filename, key), links in zip(stale, results):
+        if fresh is not None:
+            fresh[filename] = key + [sorted(links)]
+        yield filename, links - {filename}
+
+
+def parse_links(path, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of link targets in the HTML file at `path`, reading
+    the file in chunks of `chunk_size` characters.
+    """
+    links = set()
+    pending = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = pending + chunk
+            end = 0
+            for match in LINK_PATTERN.finditer(buffer):
+                links.add(match.group(1))
+                end = match.end()
+            if not chunk:
+                return links
+
+            # Keep the earliest unfinished link tag for the next chunk;
+            # other tags may contain "<" in attribute values
+            partial = PARTIAL_LINK_PATTERN.search(buffer, end)
+            pending = buffer[partial.start():] if partial else ""
+
+
+def load_link_cache(path):
+    """
+    Load the link cache at `path`, mapping each page to
+    `[mtime_ns, size, links]`. A missing file is an empty cache.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_link_cache(path, entries):
+    """
+    Atomically replace the link cache at `path` with `entries`.
+    """
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def crawl_edges(directory, path, workers=None):
+    """
+    Parse a directory of HTML pages like `crawl`, but write the links to
+    other pages in the corpus to `path` as a binary edge list sorted by
+    target page, with page names and counts in `path + ".npz"`.
+
+    Only per-page arrays are kept in memory, so memory scales with the
+    number of pages rather than the number of links. No link cache is
+    used, since it would hold every link. Return the resulting
+    `EdgeGraph`.
+    """
+    pages = sorted(f for f in os.listdir(directory) if f.endswith(".html"))
+    index = {page: i for i, page in enumerate(pages)}
+    out_degree = np.zeros(len(pages), dtype=np.int64)
+    in_degree = np.zeros(len(pages), dtype=np.int64)
+
+    # Write edges in crawl order first
+    unsorted_path = f"{path}.unsorted"
+    with open(unsorted_path, "wb") as f:
+        for page, links in iter_links(directory, workers):
+            targets = [index[link] for link in links if link in index]
+            out_degree[index[page]] = len(targets)
+            in_degree[targets] += 1
+            edges = np.empty(len(targets), dtype=EDGE_DTYPE)
+            edges["source"] = index[page]
+            edges["target"] = targets
+            f.write(edges.tobytes())
+
+    # Counting sort by target, moving one block of edges at a time
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum(in_degree, out=offsets[1:])
+    total = int(offsets[-1])
+    if total:
+        unsorted = np.memmap(unsorted_path, dtype=EDGE_DTYPE, mode="r")
+        edges = np.memmap(path, dtype=EDGE_DTYPE, mode="w+", shape=(total,))
+        cursor = offsets[:-1].copy()
+        for start in range(0, total, BLOCK_EDGES):
+            block = unsorted[start:start + BLOCK_EDGES]
+            block = block[np.argsort(block["target"], kind="stable")]
+            targets = block["target"].astype(np.int64)
+            firsts = np.searchsorted(targets, targets)
+            edges[cursor[targets] + np.arange(len(block)) - firsts] = block
+            unique, counts = np.unique(targets, return_counts=True)
+            cursor[unique] += counts
+        edges.flush()
+        del unsorted, edges
+    else:
+        open(path, "wb").close()
+    os.remove(unsorted_path)
+
+    np.savez(f"{path}.npz", pages=np.array(pages), out_degree=out_degree)
+    return EdgeGraph(path)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -70,75 +240,511 @@ def transition_model(corpus, page, damping_factor):
     return transition_dict
 
 
-def random_page(corpus):
-    return random.choice(list(corpus.keys()))
-
-
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, walkers=WALKERS, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    The samples are split over `walkers` independent random surfers,
+    advanced together; `seed` seeds the NumPy random generator.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # 初始化计数器字典
-    counter = {}
-    for key in corpus.keys():
-        counter[key] = 0
-    # 随机选一个起始page
-    page = random_page(corpus)
-    counter[page] = 1
-    # 随后执行 n-1 次 访问下一个网页的动作
-    for i in range(n - 1):
-        trans_model = transition_model(corpus, page, damping_factor)
-        if len(trans_model) == 0:
-            page = random_page(corpus)
+    graph = LinkGraph(corpus)
+    rng = np.random.default_rng(seed)
+    counts = sample_walks(graph, damping_factor, n, walkers, rng)
+    return graph.to_dict(counts / n)
+
+
+def sample_walks(graph, damping_factor, n, walkers, rng):
+    """
+    Advance `walkers` random surfers over `graph` in lock step until `n`
+    pages have been visited in total, and return the visit count of
+    every page.
+    """
+    walkers = max(1, min(walkers, n))
+    indptr = graph.out_links.indptr
+    indices = graph.out_links.indices
+    counts = np.zeros(graph.size, dtype=np.int64)
+
+    # Visits are buffered and counted in one bincount per batch
+    rows = max(1, VISIT_BUFFER // walkers)
+    visits = np.empty((rows, walkers), dtype=np.int64)
+    pages = rng.integers(graph.size, size=walkers)
+    remaining = n
+    while remaining > 0:
+        steps = min(rows, -(-remaining // walkers))
+        for step in range(steps):
+            visits[step] = pages
+
+            # Follow a random link with probability `damping_factor`,
+            # otherwise (or from a page without links) jump anywhere
+            follow = rng.random(walkers) < damping_factor
+            follow &= ~graph.dangling[pages]
+            current = pages[follow]
+            offsets = rng.random(len(current)) * graph.out_degree[current]
+            pages = rng.integers(graph.size, size=walkers)
+            pages[follow] = indices[indptr[current] + offsets.astype(np.int64)]
+
+        batch = visits[:steps].ravel()[:remaining]
+        counts += np.bincount(batch, minlength=graph.size)
+        remaining -= len(batch)
+
+    return counts
+
+
+class LinkGraph():
+    """
+    Compressed sparse representation of a corpus.
+
+    Pages are numbered in corpus order. `out_links` is a CSR matrix whose
+    row `i` holds the pages linked to by page `i`; `in_links` is its
+    transpose, so row `i` holds the pages linking to page `i`.
+    """
+
+    def __init__(self, corpus):
+        self.pages = list(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.size = len(self.pages)
+
+        # Out-degrees give the row pointers of the CSR adjacency
+        self.out_degree = np.fromiter(
+            (len(corpus[page]) for page in self.pages),
+            dtype=np.int64, count=self.size
+        )
+        indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(self.out_degree, out=indptr[1:])
+        indices = np.fromiter(
+            (self.index[link] for page in self.pages for link in corpus[page]),
+            dtype=np.int64, count=indptr[-1]
+        )
+        data = np.ones(len(indices), dtype=np.float64)
+        self.out_links = sparse.csr_matrix(
+            (data, indices, indptr), shape=(self.size, self.size)
+        )
+        self.in_links = self.out_links.T.tocsr()
+
+        # Pages without links spread their rank evenly over the corpus
+        self.dangling = self.out_degree == 0
+        self.dangling_rows = self.dangling.astype(np.float64)
+        self.inv_degree = np.zeros(self.size)
+        np.divide(1, self.out_degree, out=self.inv_degree, where=~self.dangling)
+
+    def to_dict(self, ranks):
+        """
+        Return a dictionary mapping each page to its value in `ranks`.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+class EdgeGraph():
+    """
+    Out-of-core counterpart of `LinkGraph`, reading the edge list written
+    by `crawl_edges` through `numpy.memmap`.
+
+    Only per-page arrays are resident. `in_links` multiplies by the
+    transposed adjacency block by block, so the graph can be used with
+    `pagerank_step` and `power_iterate` for single rank vectors.
+    """
+
+    def __init__(self, path, block_size=BLOCK_EDGES):
+        with np.load(f"{path}.npz") as meta:
+            self.pages = meta["pages"].tolist()
+            self.out_degree = meta["out_degree"]
+        self.size = len(self.pages)
+        self.in_links = EdgeList(path, self.size, block_size)
+
+        self.dangling = self.out_degree == 0
+        self.dangling_rows = self.dangling.astype(np.float64)
+        self.inv_degree = np.zeros(self.size)
+        np.divide(1, self.out_degree, out=self.inv_degree, where=~self.dangling)
+
+    def to_dict(self, ranks):
+        """
+        Return a dictionary mapping each page to its value in `ranks`.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+class EdgeList():
+    """
+    Memory-mapped edge list sorted by target, used as the matrix whose
+    row `i` holds the pages linking to page `i`.
+    """
+
+    def __init__(self, path, size, block_size=BLOCK_EDGES):
+        self.size = size
+        self.block_size = block_size
+        if os.path.getsize(path):
+            self.edges = np.memmap(path, dtype=EDGE_DTYPE, mode="r")
         else:
-            page = random.choices(list(trans_model.keys()), weights=list(trans_model.values()), k=1)[0]
-        counter[page] += 1
-    # 估计每个page的estimate importance 并返回
-    prs = {}
-    for (key, value) in counter.items():
-        prs[key] = value / n
-    return prs
+            self.edges = np.empty(0, dtype=EDGE_DTYPE)
 
+    def __matmul__(self, values):
+        """
+        Return, for every page, the sum of `values` over the pages
+        linking to it.
+        """
+        result = np.zeros(self.size)
+        for start in range(0, len(self.edges), self.block_size):
+            block = self.edges[start:start + self.block_size]
+            sources = block["source"]
+            targets = block["target"]
 
-def iterate_pagerank(corpus, damping_factor):
+            # Targets are sorted, so each block covers one range of pages
+            first, last = int(targets[0]), int(targets[-1])
+            result[first:last + 1] += np.bincount(
+                targets - first, weights=values[sources],
+                minlength=last - first + 1
+            )
+        return result
+
+
+def pagerank_step(graph, ranks, damping_factor, teleport=None):
+    """
+    Apply the PageRank formula once to every page of `graph`.
+
+    `ranks` is a rank vector, or a matrix with one rank vector per
+    column. Random jumps, and the rank of pages without links, are
+    spread according to `teleport`, a distribution over pages shaped
+    like `ranks` (dense, or a sparse COO matrix when `ranks` is a
+    matrix); by default they are spread uniformly.
+    """
+    dangling_mass = graph.dangling_rows @ ranks
+    inv_degree = graph.inv_degree.reshape((-1,) + (1,) * (ranks.ndim - 1))
+    new_ranks = graph.in_links @ (ranks * inv_degree)
+    new_ranks *= damping_factor
+    jump = 1 - damping_factor + damping_factor * dangling_mass
+    if teleport is None:
+        new_ranks += jump / graph.size
+    elif sparse.issparse(teleport):
+        new_ranks[teleport.row, teleport.col] += jump[teleport.col] * teleport.data
+    else:
+        new_ranks += jump * teleport
+    return new_ranks
+
+
+class PageRankStats():
+    """
+    Convergence record of an iterative PageRank solve: the residual and
+    elapsed wall time after every iteration, and the work done, counted
+    in matrix-vector products.
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self.matvecs = 0
+        self.residuals = []
+        self.times = []
+        self.converged = False
+        self.start = time.perf_counter()
+
+    def record(self, residual):
+        """
+        Record one more iteration ending with `residual`.
+        """
+        self.iterations += 1
+        self.residuals.append(float(residual))
+        self.times.append(time.perf_counter() - self.start)
+
+    def __str__(self):
+        status = "converged" if self.converged else "stopped"
+        elapsed = self.times[-1] if self.times else 0
+        residual = self.residuals[-1] if self.residuals else float("nan")
+        return (f"{status} after {self.iterations} iterations "
+                f"({self.matvecs} mat-vecs) in {elapsed:.3f}s, residual {residual:.3g}")
+
+
+def l1_norm(change):
+    """
+    Return the largest L1 norm of any column of `change`, which is
+    overwritten.
+    """
+    return np.abs(change, out=change).sum(axis=0).max()
+
+
+def l2_norm(change):
+    """
+    Return the largest L2 norm of any column of `change`, which is
+    overwritten.
+    """
+    return np.sqrt(np.square(change, out=change).sum(axis=0)).max()
+
+
+def max_norm(change):
+    """
+    Return the largest absolute entry of `change`, which is overwritten.
+    """
+    return np.abs(change, out=change).max()
+
+
+NORMS = {
+    "l1": l1_norm,
+    "l2": l2_norm,
+    "max": max_norm,
+}
+
+
+def power_iterate(graph, damping_factor, tolerance=TOLERANCE, ranks=None,
+                  teleport=None, method="power", norm="l1",
+                  max_iterations=None, stats=None, callback=None):
+    """
+    Run the PageRank solver named `method` (a key of `SOLVERS`) starting
+    from `ranks` (`teleport`, or uniform, by default) until the `norm`
+    (a key of `NORMS`) of the change between two iterations is below
+    `tolerance` for every column, or `max_iterations` is reached.
+    Return the final ranks.
+
+    Every iteration, and the work the solver did for it, is recorded in
+    `stats` (a `PageRankStats`, created if not given), which is then
+    passed to `callback` if there is one.
+    """
+    if ranks is None:
+        if teleport is None:
+            ranks = np.full(graph.size, 1 / graph.size)
+        else:
+            ranks = teleport.toarray() if sparse.issparse(teleport) else teleport.copy()
+    measure = NORMS[norm]
+    if stats is None:
+        stats = PageRankStats()
+
+    sweeps = SOLVERS[method](
+        graph, damping_factor, ranks, teleport, tolerance, stats
+    )
+    for new_ranks in sweeps:
+        residual = measure(np.subtract(new_ranks, ranks))
+        ranks = new_ranks
+        stats.record(residual)
+        if callback is not None:
+            callback(stats)
+        if residual < tolerance:
+            stats.converged = True
+            break
+        if max_iterations is not None and stats.iterations >= max_iterations:
+            break
+    return ranks
+
+
+def power_sweeps(graph, damping_factor, ranks, teleport, tolerance,
+                 stats):
+    """
+    Yield successive power iterations.
+    """
+    while True:
+        ranks = pagerank_step(graph, ranks, damping_factor, teleport)
+        stats.matvecs += 1
+        yield ranks
+
+
+def aitken_sweeps(graph, damping_factor, ranks, teleport, tolerance,
+                  stats):
+    """
+    Yield successive power iterations, trying the componentwise Aitken
+    extrapolation of the last three every `AITKEN_PERIOD` iterations.
+
+    An extrapolation is only kept when one power step from it moves less
+    than the last power step did, so it can never slow convergence down
+    by more than the extra step spent checking it.
+    """
+    history = []
+    iteration = 0
+    while True:
+        ranks = pagerank_step(graph, ranks, damping_factor, teleport)
+        stats.matvecs += 1
+        iteration += 1
+        history = history[-2:] + [ranks]
+        if iteration % AITKEN_PERIOD == 0 and len(history) == 3:
+            extrapolated = aitken_extrapolate(*history)
+            stepped = pagerank_step(graph, extrapolated, damping_factor, teleport)
+            stats.matvecs += 1
+            before = l1_norm(history[2] - history[1])
+            if l1_norm(stepped - extrapolated) < before:
+                ranks = stepped
+            history = []
+        yield ranks
+
+
+def aitken_extrapolate(oldest, older, latest):
+    """
+    Return the componentwise Aitken extrapolation of three successive
+    iterations, renormalized to sum to 1.
+    """
+    first = older - oldest
+    second = latest - 2 * older + oldest
+    safe = np.abs(second) > np.finfo(float).eps
+    extrapolated = latest.copy()
+    extrapolated[safe] = oldest[safe] - first[safe] ** 2 / second[safe]
+    np.maximum(extrapolated, 0, out=extrapolated)
+    return extrapolated / extrapolated.sum(axis=0)
+
+
+SOLVERS = {
+    "power": power_sweeps,
+    "aitken": aitken_sweeps,
+}
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                     **options):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    `options` (solver method, norm, iteration limit, stats and callback)
+    are passed on to `power_iterate`.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # 初始化 阈值 以及 每个page的estimated importance为 1/N
-    threshold = 0.001
-    prs = {}
-    old_prs = {}
-    for key in corpus.keys():
-        old_prs[key] = 1 / len(corpus)
+    graph = LinkGraph(corpus)
+    ranks = power_iterate(graph, damping_factor, tolerance, **options)
+    return graph.to_dict(ranks)
 
-    # 根据公式迭代，直到误差小于threshold（所有的estimate importance差值都小于threshold）
-    while True:
-        check_continue = False
-        for p in corpus.keys():
-            # sum求和
-            linking_sum = 0
-            for linking_p in corpus.keys():
-                if len(corpus[linking_p]) == 0:
-                    linking_sum += old_prs[linking_p] / len(corpus)
-                elif p in corpus[linking_p]:
-                    linking_sum += old_prs[linking_p] / len(corpus[linking_p])
-            prs[p] = (1 - damping_factor) / len(corpus) + damping_factor * linking_sum
-        diff = max([abs(prs[x] - old_prs[x]) for x in old_prs.keys()])
-        if diff < threshold:
+
+def iterate_pagerank_file(path, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page of the edge list at `path`
+    (written by `crawl_edges`), iterating over the file in blocks.
+    """
+    graph = EdgeGraph(path)
+    return graph.to_dict(power_iterate(graph, damping_factor, tolerance))
+
+
+def personalized_pagerank(corpus, damping_factor, personalizations,
+                          tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values for each page, solving every
+    personalization together as one sparse matrix-times-dense-matrix
+    iteration.
+
+    `personalizations` is a list of dictionaries mapping pages to
+    (unnormalized) teleport weights; pages left out get weight 0.
+
+    Return `(index, ranks)`, where `index` maps each page to its row of
+    `ranks` and column `k` of `ranks` holds the PageRank values for
+    `personalizations[k]`.
+    """
+    graph = LinkGraph(corpus)
+    rows, columns, weights = [], [], []
+    for k, personalization in enumerate(personalizations):
+        for page, weight in personalization.items():
+            rows.append(graph.index[page])
+            columns.append(k)
+            weights.append(weight)
+    teleport = sparse.coo_matrix(
+        (np.array(weights, dtype=np.float64), (rows, columns)),
+        shape=(graph.size, len(personalizations))
+    )
+    teleport.sum_duplicates()
+    totals = np.asarray(teleport.sum(axis=0)).ravel()
+    if not np.all(totals > 0):
+        raise ValueError("every personalization needs a positive weight")
+    teleport.data /= totals[teleport.col]
+    ranks = power_iterate(graph, damping_factor, tolerance, teleport=teleport)
+    return graph.index, ranks
+
+
+def update_pagerank(corpus, ranks, damping_factor, added=(), removed=(),
+                    removed_pages=(), tolerance=TOLERANCE):
+    """
+    Apply a delta to `corpus` in place and return its new PageRank values,
+    starting from the previous values in `ranks`.
+
+    `added` and `removed` are iterables of `(page, link)` edges; pages that
+    appear in `added` are added to the corpus if needed. `removed_pages`
+    are dropped from the corpus along with every link to them.
+
+    The residual of the old ranks is pushed through the changed
+    neighborhood first, then power iteration finishes the update, so the
+    result matches a full recompute within `tolerance`.
+    """
+    apply_delta(corpus, added, removed, removed_pages)
+    graph = LinkGraph(corpus)
+
+    # Warm start from the old ranks; new pages start at 1 / N
+    start = np.fromiter(
+        (ranks.get(page, 1 / graph.size) for page in graph.pages),
+        dtype=np.float64, count=graph.size
+    )
+    start /= start.sum()
+    start = push_residual(graph, start, damping_factor, tolerance)
+    return graph.to_dict(power_iterate(graph, damping_factor, tolerance, start))
+
+
+def apply_delta(corpus, added=(), removed=(), removed_pages=()):
+    """
+    Update `corpus` in place with added and removed `(page, link)` edges
+    and removed pages.
+    """
+    removed_pages = set(removed_pages)
+    for page in removed_pages:
+        corpus.pop(page, None)
+    if removed_pages:
+        for links in corpus.values():
+            links -= removed_pages
+    for page, link in removed:
+        if page in corpus:
+            corpus[page].discard(link)
+    for page, link in added:
+        corpus.setdefault(page, set())
+        corpus.setdefault(link, set())
+        if link != page:
+            corpus[page].add(link)
+
+
+def push_residual(graph, ranks, damping_factor, tolerance):
+    """
+    Improve `ranks` by pushing residual from page to page, Gauss-Seidel
+    style, and return the improved rank vector.
+
+    When `ranks` was converged before a small change, only pages near the
+    change carry much residual, so only that neighborhood is touched.
+    Any residual shared evenly by all pages (e.g. from pages gaining or
+    losing their last link) only rescales the solution, so it is removed
+    by renormalizing at the end instead of being pushed. Whatever residual
+    is left once the push budget runs out is left to power iteration.
+    """
+    ranks = ranks.copy()
+    residual = pagerank_step(graph, ranks, damping_factor) - ranks
+    residual -= np.median(residual)
+
+    # The smallest residuals, summing to at most `tolerance`, are left alone
+    magnitudes = np.sort(np.abs(residual))
+    below = np.searchsorted(np.cumsum(magnitudes), tolerance, side="right")
+    if below == graph.size:
+        return ranks
+    threshold = max(magnitudes[below - 1] if below else 0, tolerance / graph.size)
+
+    indptr = graph.out_links.indptr
+    indices = graph.out_links.indices
+    queue = deque(np.flatnonzero(np.abs(residual) > threshold).tolist())
+    queued = np.zeros(graph.size, dtype=bool)
+    queued[queue] = True
+
+    # Give up on locality after 64 pushes per initially selected page
+    for _ in range(min(graph.size, 64 * len(queue))):
+        if not queue:
             break
-        else:
-            old_prs = prs.copy()
-    return old_prs
+        page = queue.popleft()
+        queued[page] = False
+        mass = residual[page]
+        if abs(mass) <= threshold:
+            continue
+        ranks[page] += mass
+        residual[page] = 0
+        if graph.dangling[page]:
+            continue
+        links = indices[indptr[page]:indptr[page + 1]]
+        residual[links] += damping_factor * mass * graph.inv_degree[page]
+        for link in links[np.abs(residual[links]) > threshold].tolist():
+            if not queued[link]:
+                queued[link] = True
+                queue.append(link)
+
+    return ranks / ranks.sum()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import random
+
+import numpy as np
+import pytest
+
+import pagerank
+
+
+def test_parse_links_matches_whole_file(tmp_path):
+    html = (
+        "x" * 90
+        + '<a title="a<b" href="2.html">two</a>'
+        + '<p onclick="if(a<b)">text</p><abbr title="<a">'
+        + '<a\nclass="x>" href="3.html">three</a>'
+        + '<a title="<a href" href="4>.html">four</a><a'
+    )
+    path = tmp_path / "page.html"
+    path.write_text(html)
+    expected = set(pagerank.LINK_PATTERN.findall(html))
+    for chunk_size in range(1, len(html) + 2):
+        assert pagerank.parse_links(path, chunk_size) == expected
+
+
+def random_corpus(seed, size=40, links=3):
+    """
+    Return a random corpus of `size` pages, some of them without links.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(size)]
+    return {
+        page: set(rng.sample(pages, rng.randint(0, links))) - {page}
+        for page in pages
+    }
+
+
+def l1_distance(ranks, expected):
+    assert set(ranks) == set(expected)
+    return sum(abs(ranks[page] - expected[page]) for page in expected)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_update_pagerank_matches_recompute(seed):
+    rng = random.Random(seed)
+    corpus = random_corpus(seed)
+    ranks = pagerank.iterate_pagerank(corpus, pagerank.DAMPING)
+    pages = sorted(corpus)
+    edges = sorted((page, link) for page in pages for link in corpus[page])
+    removed_pages = rng.sample(pages[1:], 2)
+    kept = [page for page in pages if page not in removed_pages]
+    added = [tuple(rng.sample(kept, 2)) for _ in range(3)]
+    added.append((pages[0], "new.html"))
+    removed = rng.sample(edges, 3)
+
+    updated = pagerank.update_pagerank(
+        corpus, ranks, pagerank.DAMPING, added, removed, removed_pages
+    )
+    assert "new.html" in corpus
+    assert not set(removed_pages) & set(corpus)
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, 1e-12)
+    assert l1_distance(updated, expected) < 10 * pagerank.TOLERANCE
+
+
+def test_personalized_pagerank_matches_iterate_pagerank():
+    corpus = random_corpus(0)
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, 1e-12)
+    uniform = dict.fromkeys(corpus, 1)
+    focused = {"0.html": 2, "1.html": 1}
+    index, ranks = pagerank.personalized_pagerank(
+        corpus, pagerank.DAMPING, [uniform, focused], 1e-12
+    )
+    assert np.allclose(ranks.sum(axis=0), 1)
+    personalized = {page: ranks[i, 0] for page, i in index.items()}
+    assert l1_distance(personalized, expected) < 1e-9
+
+    # Solving together matches solving each personalization alone
+    _, alone = pagerank.personalized_pagerank(
+        corpus, pagerank.DAMPING, [focused], 1e-12
+    )
+    assert np.allclose(ranks[:, 1], alone[:, 0], atol=1e-9)
+
+
+def test_iterate_pagerank_file_matches_iterate_pagerank(tmp_path, monkeypatch):
+    corpus = random_corpus(1)
+    directory = tmp_path / "corpus"
+    directory.mkdir()
+    for page, links in corpus.items():
+        body = "".join(f'<a href="{link}">{link}</a>' for link in sorted(links))
+        (directory / page).write_text(f"<html><body>{body}"
+                                      '<a href="missing.html">x</a></body></html>')
+    assert pagerank.crawl(directory) == corpus
+    expected = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, 1e-12)
+
+    # Small blocks straddle targets both when sorting and when iterating
+    monkeypatch.setattr(pagerank, "BLOCK_EDGES", 5)
+    path = str(tmp_path / "edges.bin")
+    pagerank.crawl_edges(directory, path)
+    graph = pagerank.EdgeGraph(path, block_size=5)
+    ranks = graph.to_dict(pagerank.power_iterate(graph, pagerank.DAMPING, 1e-12))
+    assert l1_distance(ranks, expected) < 1e-9
+
+    ranks = pagerank.iterate_pagerank_file(path, pagerank.DAMPING, 1e-12)
+    assert l1_distance(ranks, expected) < 1e-9
+
+
+def test_crawl_link_cache(tmp_path):
+    directory = tmp_path / "corpus"
+    directory.mkdir()
+    (directory / "1.html").write_text('<a href="2.html">two</a>')
+    (directory / "2.html").write_text('<a href="1.html">one</a>')
+    cache = tmp_path / "links.json"
+    expected = {"1.html": {"2.html"}, "2.html": {"1.html"}}
+    assert pagerank.crawl(directory, cache=str(cache)) == expected
+    assert pagerank.crawl(directory, cache=str(cache)) == expected
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["corpus", "links.json"]
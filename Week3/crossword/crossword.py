@@ -1,3 +1,13 @@
+import bisect
+import functools
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import tempfile
+
+
 class Variable():
 
     ACROSS = "across"
@@ -35,10 +45,246 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+# Number of set bits in an int, for counting words in a bitset domain
+popcount = getattr(int, "bit_count", None) or (lambda n: bin(n).count("1"))
+
+# First bytes of a compiled lexicon file
+LEXICON_MAGIC = b"CWLEX\x00\x00\x01"
+
+# Version of the values pickled by `save_cached`, to be bumped whenever
+# they change (e.g. with `STRUCTURE_FIELDS`) so old entries are rebuilt
+CACHE_VERSION = 1
+
+# Crossword attributes kept in the structure cache
+STRUCTURE_FIELDS = [
+    "height", "width", "structure", "variables", "overlaps", "adjacency"
+]
+
+
+class Bucket():
+
+    def __init__(self, contents, offset, length, count, encoding):
+        """
+        Read-only sequence of the `count` words of `length` stored back to
+        back from `offset` in the memory-mapped `contents`.
+        """
+        self.contents = contents
+        self.offset = offset
+        self.count = count
+        self.encoding = encoding
+        self.size = length * (1 if encoding == "ascii" else 4)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        start = self.offset + n * self.size
+        return str(self.contents[start:start + self.size], self.encoding)
+
+
+class Lexicon():
+
+    def __init__(self, words):
+        """
+        Number the words of each length and build, for every length,
+        position and letter, a bitset of the words with that letter there.
+        """
+        # Words of each length, sorted, so a word's bit is its position
+        self.buckets = dict()
+        for word in sorted(words):
+            self.buckets.setdefault(len(word), []).append(word)
+
+        # Masks keyed by (length, position, letter), and the letters that
+        # occur at each (length, position)
+        self.masks = dict()
+        self.letters = dict()
+
+        # For a memory-mapped lexicon, its file, the mapped contents and
+        # the offsets of masks not yet read
+        self.path = None
+        self.contents = None
+        self.offsets = dict()
+        for length, bucket in self.buckets.items():
+            for k in range(length):
+                column = "".join(word[k] for word in bucket)
+                letters = sorted(set(column))
+                self.letters[length, k] = letters
+                for letter in letters:
+                    # Bit n of the mask is the nth character of the column
+                    table = {ord(c): "0" for c in letters}
+                    table[ord(letter)] = "1"
+                    self.masks[length, k, letter] = int(
+                        column.translate(table)[::-1], 2
+                    )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a lexicon written by `save`. Words and masks are read
+        from the file when first used.
+        """
+        with open(path, "rb") as f:
+            contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if contents[:8] != LEXICON_MAGIC:
+            raise ValueError(f"{path} is not a compiled lexicon")
+        size = int.from_bytes(contents[8:16], "little")
+        header = json.loads(contents[16:16 + size])
+        base = 16 + size
+
+        lexicon = cls([])
+        lexicon.path = path
+        lexicon.contents = contents
+        lexicon.source = header["source"]
+        for length, bucket in header["buckets"].items():
+            length = int(length)
+            lexicon.buckets[length] = Bucket(
+                contents, base + bucket["offset"], length, bucket["count"],
+                header["encoding"]
+            )
+            for k, offsets in enumerate(bucket["letters"]):
+                lexicon.letters[length, k] = sorted(offsets)
+                for letter, offset in offsets.items():
+                    lexicon.offsets[length, k, letter] = base + offset
+        return lexicon
+
+    def save(self, path, source):
+        """
+        Atomically write the lexicon to `path` for `load`, tagged with
+        `source` to identify the words file it was compiled from.
+
+        The file holds a magic number, the length of a JSON header, the
+        header, and then for each word length the words back to back in
+        bit order followed by the masks of each position and letter.
+        """
+        encoding = "ascii"
+        if not all(word.isascii() for word in self):
+            encoding = "utf-32-le"
+
+        header = {"source": source, "encoding": encoding, "buckets": {}}
+        chunks = []
+        offset = 0
+        for length, bucket in sorted(self.buckets.items()):
+            words = "".join(bucket).encode(encoding)
+            entry = {"count": len(bucket), "offset": offset, "letters": []}
+            chunks.append(words)
+            offset += len(words)
+
+            size = (len(bucket) + 7) // 8
+            for k in range(length):
+                offsets = dict()
+                for letter in self.letters[length, k]:
+                    mask = self.mask(length, k, letter)
+                    chunks.append(mask.to_bytes(size, "little"))
+                    offsets[letter] = offset
+                    offset += size
+                entry["letters"].append(offsets)
+            header["buckets"][str(length)] = entry
+
+        header = json.dumps(header).encode()
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(LEXICON_MAGIC)
+                f.write(len(header).to_bytes(8, "little"))
+                f.write(header)
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def __getstate__(self):
+        # A memory-mapped lexicon is pickled as its path and mapped again
+        if self.path is None:
+            return self.__dict__
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        if "buckets" not in state:
+            state = Lexicon.load(state["path"]).__dict__
+        self.__dict__.update(state)
+
+    def __iter__(self):
+        for bucket in self.buckets.values():
+            yield from bucket
+
+    def full(self, length):
+        """Return the bitset of all words of a given length."""
+        return (1 << len(self.buckets.get(length, []))) - 1
+
+    def mask(self, length, position, letter):
+        """Return the bitset of words of `length` with `letter` at `position`."""
+        key = (length, position, letter)
+        mask = self.masks.get(key)
+        if mask is None:
+            offset = self.offsets.get(key)
+            if offset is None:
+                return 0
+            size = (len(self.buckets[length]) + 7) // 8
+            mask = int.from_bytes(
+                self.contents[offset:offset + size], "little"
+            )
+            self.masks[key] = mask
+        return mask
+
+    def bit(self, word):
+        """Return the bitset holding only `word`."""
+        bucket = self.buckets.get(len(word), [])
+        n = bisect.bisect_left(bucket, word)
+        if n == len(bucket) or bucket[n] != word:
+            raise KeyError(word)
+        return 1 << n
+
+    def words(self, length, domain):
+        """Return the words of `length` in the bitset `domain`."""
+        bucket = self.buckets.get(length, [])
+        digits = bin(domain)[:1:-1]
+        words = []
+        n = digits.find("1")
+        while n != -1:
+            words.append(bucket[n])
+            n = digits.find("1", n + 1)
+        return words
+
+
 class Crossword():
 
-    def __init__(self, structure_file, words_file):
+    def __init__(self, structure_file, words_file, cache=None):
+        """
+        Load the crossword structure and vocabulary. If `cache` names a
+        directory, the parsed structure and the compiled lexicon are kept
+        there and reused while their source files are unchanged.
+        """
+        cached = None
+        if cache is not None:
+            cached = load_cached(cache_path(structure_file, cache, ".pickle"),
+                                 structure_file)
+        if cached is None:
+            self.read_structure(structure_file)
+            if cache is not None:
+                save_cached(
+                    cache_path(structure_file, cache, ".pickle"),
+                    structure_file,
+                    {field: getattr(self, field) for field in STRUCTURE_FIELDS}
+                )
+        else:
+            self.__dict__.update(cached)
+
+        self.lexicon = load_lexicon(words_file, cache)
 
+    @functools.cached_property
+    def words(self):
+        """Set of all words in the vocabulary, built on first use."""
+        return set(self.lexicon)
+
+    def read_structure(self, structure_file):
+        """
+        Parse the structure file and determine its variables, overlaps
+        and neighbors.
+        """
         # Determine structure of crossword
         with open(structure_file) as f:
             contents = f.read().splitlines()
@@ -57,10 +303,6 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
-
         # Determine variable set
         self.variables = set()
         for i in range(self.height):
@@ -104,30 +346,101 @@ class Crossword():
                             length=length
                         ))
 
-        # Compute overlaps for each word
-        # For any pair of variables v1, v2, their overlap is either:
-        #    None, if the two variables do not overlap; or
+        # Map each cell to the variables through it and their positions
+        cell_variables = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                cell_variables.setdefault(cell, []).append((var, k))
+
+        # Compute overlaps and neighbors from cells shared by two variables
+        # For any overlapping pair of variables v1, v2, their overlap is
         #    (i, j), where v1's ith character overlaps v2's jth character
+        # Pairs that do not overlap have no entry
         self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        self.adjacency = {var: set() for var in self.variables}
+        for pairs in cell_variables.values():
+            for v1, i in pairs:
+                for v2, j in pairs:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        self.adjacency[v1].add(v2)
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.adjacency[var]
+
+
+def cache_path(source, cache, suffix):
+    """
+    Return the path in the `cache` directory for a file derived from
+    `source`, named after it and a hash of its absolute path so that
+    sources with the same name in different directories do not collide.
+    """
+    digest = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()
+    name = f"{os.path.basename(source)}.{digest[:12]}{suffix}"
+    return os.path.join(cache, name)
+
+
+def source_key(source):
+    """Identify the current version of the file `source`."""
+    stat = os.stat(source)
+    return [os.path.abspath(source), stat.st_size, stat.st_mtime_ns]
+
+
+def cache_key(source):
+    """Identify the current version of `source` and of the cache format."""
+    return [CACHE_VERSION] + source_key(source)
+
+
+def load_cached(path, source):
+    """
+    Return the value pickled at `path` by `save_cached` if it was cached
+    for the current version of `source` and `CACHE_VERSION`, otherwise
+    None. A file that cannot be unpickled, e.g. one written by another
+    version of this code, counts as missing.
+    """
+    try:
+        with open(path, "rb") as f:
+            key, value = pickle.load(f)
+    except Exception:
+        return None
+    return value if key == cache_key(source) else None
+
+
+def save_cached(path, source, value):
+    """
+    Atomically pickle `value` to `path`, tagged with the current version
+    of `source` and `CACHE_VERSION`.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((cache_key(source), value), f)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def load_lexicon(words_file, cache=None):
+    """
+    Return the Lexicon of the upper-cased words in `words_file`. If
+    `cache` names a directory, memory-map the lexicon compiled there from
+    the current version of the file, compiling it first if needed.
+    """
+    if cache is not None:
+        path = cache_path(words_file, cache, ".lex")
+        try:
+            lexicon = Lexicon.load(path)
+            if lexicon.source == source_key(words_file):
+                return lexicon
+        except (FileNotFoundError, ValueError):
+            pass
+
+    with open(words_file) as f:
+        lexicon = Lexicon(set(f.read().upper().splitlines()))
+    if cache is not None:
+        os.makedirs(cache, exist_ok=True)
+        lexicon.save(path, source_key(words_file))
+    return lexicon
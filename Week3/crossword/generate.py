@@ -1,8 +1,37 @@
+import functools
+import heapq
+import itertools
+import multiprocessing
+import os
 import random
+import string
 import sys
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
 
 from crossword import *
 
+# Nodes in the shortest restart of a randomized search
+RESTART_UNIT = 100
+
+# Nodes between checks for cancellation by another portfolio worker
+CANCEL_CHECK = 64
+
+# Entries per variable the MRV heap may grow to before it is rebuilt
+HEAP_SLACK = 4
+
+# Image rendering settings
+FONT_PATH = "assets/fonts/OpenSans-Regular.ttf"
+FONT_SIZE = 80
+CELL_SIZE = 100
+CELL_BORDER = 2
+
+
+class SearchLimit(Exception):
+    """Raised when a search runs out of nodes or is cancelled."""
+
 
 class CrosswordCreator():
 
@@ -11,11 +40,50 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+        self.lexicon = crossword.lexicon
+
+        # Each domain is a bitset over the lexicon's words of the variable's
+        # length, so it starts out node-consistent
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.lexicon.full(var.length)
             for var in self.crossword.variables
         }
 
+        # Bit of each variable in conflict sets
+        self.bits = {
+            var: 1 << n
+            for n, var in enumerate(self.crossword.variables)
+        }
+
+        # Assigned variables responsible for each domain's removals, as
+        # bitsets of variables, and the explanation of the last wipeout
+        self.explanations = {var: 0 for var in self.domains}
+        self.conflict = 0
+
+        # Domains replaced during search, as (variable, old domain,
+        # old explanation) triples
+        self.trail = []
+
+        # Nogoods learned by backjumping, as frozensets of (variable, word)
+        # pairs, indexed by each of their pairs
+        self.nogoods = None
+
+        # Search statistics
+        self.nodes = 0
+        self.backtracks = 0
+
+        # Source of random tie-breaks, node limit of the current search and
+        # event that cancels it
+        self.random = random
+        self.limit = None
+        self.cancel = None
+
+        # MRV heap of (domain size, -degree, random tie-break, count,
+        # variable) entries, built on first use; entries whose size no
+        # longer matches the domain are skipped when they reach the top
+        self.heap = None
+        self.counter = itertools.count()
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -49,64 +117,281 @@ class CrosswordCreator():
         """
         Save crossword assignment to an image file.
         """
-        from PIL import Image, ImageDraw, ImageFont
-        cell_size = 100
-        cell_border = 2
-        interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
+        self.save_many([(assignment, filename)])
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
-        )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
+    def save_many(self, outputs, workers=None):
+        """
+        Save many crossword assignments to image files, given `outputs`
+        as (assignment, filename) pairs, rendering and encoding them on a
+        pool of `workers` threads.
+        """
+        renderer = get_renderer()
+        grids = [(self.letter_grid(assignment), filename)
+                 for assignment, filename in outputs]
 
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
+        # Add tiles for any unusual letters before the threads share them
+        for letters, _ in grids:
+            for row in letters:
+                for letter in row:
+                    if letter:
+                        renderer.tile(letter)
 
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        _, _, w, h = draw.textbbox((0, 0), letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
+        def save(grid):
+            letters, filename = grid
+            renderer.render(self.crossword.structure, letters).save(filename)
 
-        img.save(filename)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(save, grids))
 
-    def solve(self):
+    def solve(self, strategy="chronological", nogoods=False):
         """
         Enforce node and arc consistency, and then solve the CSP.
+
+        `strategy` is "chronological" for plain backtracking or
+        "backjumping" for conflict-directed backjumping, which can also
+        learn nogoods if `nogoods` is True. Search statistics are left in
+        `self.nodes` and `self.backtracks`. "portfolio" races randomized
+        restarting searches in several processes instead.
         """
-        self.enforce_node_consistency()
-        self.ac3()
+        if strategy == "portfolio":
+            return self.portfolio()
+        if strategy not in ["chronological", "backjumping"]:
+            raise ValueError(f"unknown strategy {strategy!r}")
+        if nogoods and strategy != "backjumping":
+            raise ValueError("nogoods require the backjumping strategy")
+
+        if not self.start(nogoods):
+            return None
+        if strategy == "backjumping":
+            return self.backjump(dict())[0]
         return self.backtrack(dict())
 
+    def start(self, nogoods=False):
+        """
+        Enforce node and arc consistency and reset the search state.
+        Return False if some domain is empty.
+        """
+        self.enforce_node_consistency()
+        if not self.ac3():
+            return False
+        self.trail = []
+        self.heap = None
+        self.explanations = {var: 0 for var in self.domains}
+        self.nogoods = dict() if nogoods else None
+        self.nodes = 0
+        self.backtracks = 0
+        return True
+
+    def solutions(self, limit=None, distinct=False):
+        """
+        Yield complete assignments one at a time as the search finds them,
+        at most `limit` of them if given. Each is a copy, so it stays valid
+        as the search moves on.
+
+        `distinct` picks how different the solutions must be:
+            * False: every solution, each once
+            * "sets": no two solutions use the same set of words (placed
+              differently). The search simply carries on past repeats.
+            * True or "words": no word is used in more than one solution.
+              Banning a solution's words can prune branches the search has
+              already passed, so after each solution its words are removed
+              from every domain and the search starts again from the root.
+        """
+        if distinct not in [False, True, "sets", "words"]:
+            raise ValueError(f"unknown distinct mode {distinct!r}")
+        if not self.start():
+            return
+        count = 0
+        seen = set()
+        while True:
+            search = self.search(dict())
+            for assignment in search:
+                if distinct == "sets":
+                    words = frozenset(assignment.values())
+                    if words in seen:
+                        continue
+                    seen.add(words)
+                yield dict(assignment)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+                if distinct in [True, "words"]:
+                    break
+            else:
+                return
+
+            # Unwind to the root and ban the words just used for good
+            search.close()
+            self.heap = None
+            self.restore(0)
+            banned = dict()
+            for var, word in assignment.items():
+                banned[var.length] = (
+                    banned.get(var.length, 0) | self.lexicon.bit(word)
+                )
+            for var in self.domains:
+                self.domains[var] &= ~banned.get(var.length, 0)
+            if not self.ac3():
+                return
+            self.trail = []
+            self.heap = None
+
+    def solve_restarts(self, strategy="chronological", seed=None,
+                       unit=RESTART_UNIT, cancel=None):
+        """
+        Solve the CSP with randomized restarts. Each search is cut off
+        after `unit` times the next term of the Luby sequence in nodes,
+        then restarted with fresh random tie-breaks from `seed`.
+
+        Return a complete assignment, or None if there is none or the
+        `cancel` event is set.
+        """
+        self.random = random.Random(seed)
+        self.cancel = cancel
+        for i in itertools.count(1):
+            self.limit = unit * luby(i)
+            try:
+                return self.solve(strategy)
+            except SearchLimit:
+                if cancel is not None and cancel.is_set():
+                    return None
+                self.heap = None
+                self.restore(0)
+            finally:
+                self.limit = None
+
+    def portfolio(self, workers=None, unit=RESTART_UNIT):
+        """
+        Race randomized restarting searches with different seeds and
+        strategies in `workers` processes. Return the result of the first
+        to finish, either a complete assignment or None if it proved there
+        is none, and cancel the rest.
+        """
+        workers = workers or os.cpu_count() or 1
+        strategies = ["chronological", "backjumping"]
+        cancel = multiprocessing.Event()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(self.crossword, cancel)
+        ) as executor:
+            pending = {
+                executor.submit(
+                    run_restarts,
+                    strategies[k % len(strategies)],
+                    self.random.randrange(1 << 32),
+                    unit
+                )
+                for k in range(workers)
+            }
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            cancel.set()
+            for future in pending:
+                future.cancel()
+            return done.pop().result()
+
+    def count_node(self):
+        """
+        Count a search node, raising SearchLimit if the search has used up
+        its node limit or has been cancelled.
+        """
+        self.nodes += 1
+        if self.limit is not None and self.nodes > self.limit:
+            raise SearchLimit
+        if (
+            self.cancel is not None
+            and self.nodes % CANCEL_CHECK == 0
+            and self.cancel.is_set()
+        ):
+            raise SearchLimit
+
     def enforce_node_consistency(self):
         """
         Update `self.domains` such that each variable is node-consistent.
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        # 遍历每个Variable
+        # Domains only hold words of the variable's length
         for var in self.domains:
-            var_domain = self.domains[var].copy()
-            for available_value in self.domains[var]:
-                if len(available_value) != var.length:
-                    var_domain.remove(available_value)
-            self.domains[var] = var_domain
+            self.domains[var] &= self.lexicon.full(var.length)
+
+    def domain_words(self, var):
+        """
+        Return the list of words in the domain of `var`.
+        """
+        return self.lexicon.words(var.length, self.domains[var])
+
+    def set_domain(self, var, domain, reason=0):
+        """
+        Replace the domain of `var`, recording the old one on the trail.
+        `reason` is the bitset of assigned variables that caused the change.
+        """
+        self.trail.append((var, self.domains[var], self.explanations[var]))
+        self.domains[var] = domain
+        self.explanations[var] |= reason
+        self.push(var)
+
+    def restore(self, mark):
+        """
+        Undo domain changes made since the trail had length `mark`,
+        most recent first.
+        """
+        while len(self.trail) > mark:
+            var, domain, explanation = self.trail.pop()
+            self.domains[var] = domain
+            self.explanations[var] = explanation
+            self.push(var)
+
+    def push(self, var):
+        """
+        Push an up-to-date MRV entry for `var` onto the heap. Once stale
+        entries make the heap too large, drop it to be rebuilt on the
+        next selection.
+        """
+        if self.heap is not None:
+            heapq.heappush(self.heap, (
+                popcount(self.domains[var]),
+                -len(self.crossword.neighbors(var)),
+                self.random.random(),
+                next(self.counter),
+                var
+            ))
+            if len(self.heap) > HEAP_SLACK * len(self.domains):
+                self.heap = None
+
+    def propagate(self, var, assignment):
+        """
+        Maintain arc consistency after assigning `var`: reduce its domain
+        to the assigned word, remove that word from the domains of other
+        unassigned variables, and run AC-3 on the arcs into every variable
+        whose domain changed. Removals are recorded on the trail.
+
+        Return False if a domain ends up empty, leaving the assigned
+        variables responsible in `self.conflict`.
+        """
+        bit = self.lexicon.bit(assignment[var])
+        self.set_domain(var, bit, self.bits[var])
+
+        changed = [var]
+        for other in self.domains:
+            if (
+                other not in assignment
+                and other.length == var.length
+                and self.domains[other] & bit
+            ):
+                self.set_domain(
+                    other, self.domains[other] & ~bit, self.bits[var]
+                )
+                if not self.domains[other]:
+                    self.conflict = self.explanations[other]
+                    return False
+                changed.append(other)
+
+        return self.ac3([
+            (z, y)
+            for y in changed
+            for z in self.crossword.neighbors(y)
+        ])
 
     def revise(self, x, y):
         """
@@ -117,26 +402,23 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        # 获得重叠位置
-        # 遍历x的domain，删除那些无法在y中找到相对应值的
+        # A letter at x's overlap position is supported if some word in
+        # y's domain has it at y's overlap position
         i, j = self.crossword.overlaps[x, y]
-        new_domain_of_x = self.domains[x].copy()
-        changes_made_on_domain = False
-        for available_value in self.domains[x]:
-            x_on_shared = available_value[i]
-            has_corresponding = False
-            for y_available_value in self.domains[y]:
-                y_on_shared = y_available_value[j]
-                if x_on_shared == y_on_shared:
-                    has_corresponding = True
-                    break
-            if not has_corresponding:
-                new_domain_of_x.remove(available_value)
-                changes_made_on_domain = True
-        if changes_made_on_domain:
-            self.domains[x] = new_domain_of_x
-
-        return changes_made_on_domain
+        domain_x = self.domains[x]
+        domain_y = self.domains[y]
+        revised = domain_x
+        for letter in self.lexicon.letters.get((x.length, i), []):
+            mask = self.lexicon.mask(x.length, i, letter)
+            if revised & mask and not (
+                domain_y & self.lexicon.mask(y.length, j, letter)
+            ):
+                revised &= ~mask
+
+        if revised == domain_x:
+            return False
+        self.set_domain(x, revised, self.explanations[y])
+        return True
 
     def ac3(self, arcs=None):
         """
@@ -147,23 +429,33 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        # 创建队列
-        ac3_queue = []  # 列表模拟队列
         if arcs is None:
-            for x in self.domains:
-                for y in self.crossword.neighbors(x):
-                    ac3_queue.append((x, y))
-        else:
-            ac3_queue = arcs.copy()
-        while len(ac3_queue) != 0:
-            x, y = ac3_queue[0]
-            ac3_queue = ac3_queue[1:]
+            arcs = [
+                (x, y)
+                for x in self.domains
+                for y in self.crossword.neighbors(x)
+            ]
+
+        # Keep each arc in the queue at most once
+        queue = deque()
+        queued = set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
+
+        while queue:
+            arc = queue.popleft()
+            queued.remove(arc)
+            x, y = arc
             if self.revise(x, y):
-                # 如果发生过修改
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
+                    self.conflict = self.explanations[x]
                     return False
-                for x_neighbor in self.crossword.neighbors(x):
-                    ac3_queue.append((x_neighbor, x))
+                for z in self.crossword.neighbors(x):
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
         return True
 
     def assignment_complete(self, assignment):
@@ -176,11 +468,28 @@ class CrosswordCreator():
                 return False
         return True
 
-    def consistent(self, assignment):
+    def consistent(self, assignment, var=None):
         """
         Return True if `assignment` is consistent (i.e., words fit in crossword
         puzzle without conflicting characters); return False otherwise.
+
+        If `var` is given, the rest of `assignment` is taken to be consistent
+        and only the word newly assigned to `var` is checked.
         """
+        if var is not None:
+            word = assignment[var]
+            if len(word) != var.length:
+                return False
+            for other, other_word in assignment.items():
+                if other != var and other_word == word:
+                    return False
+            for neighbor in self.crossword.neighbors(var):
+                if neighbor in assignment:
+                    x, y = self.crossword.overlaps[var, neighbor]
+                    if word[x] != assignment[neighbor][y]:
+                        return False
+            return True
+
         check_distinct_set = set()
         for var in assignment:
             assigned_word = assignment[var]
@@ -192,7 +501,7 @@ class CrosswordCreator():
             if len(assigned_word) != var.length:
                 return False
 
-            check_distinct_set.add(var)
+            check_distinct_set.add(assigned_word)
 
         for var in assignment:
             neighbors = self.crossword.neighbors(var)
@@ -210,21 +519,29 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        available_values = [key for key in self.domains[var]]
-        counters = [0 for x in available_values]
-        for i in range(len(available_values)):
-            value = available_values[i]
-            counter = 0
-            for neighbor in self.crossword.neighbors(var):
-                if neighbor in assignment:
-                    continue
-                x, y = self.crossword.overlaps[var, neighbor]
-                for neighbor_value in self.domains[neighbor]:
-                    if value[x] != neighbor_value[y]:
-                        counter += 1
-            counters[i] = counter
-        ans = [(available_values[i], counters[i]) for i in range(len(available_values))]
-        return [x for (x, _) in sorted(ans, key=lambda pair: pair[1])]
+        # For each unassigned neighbor, count the words each letter at the
+        # overlap would rule out, so a value's score is a sum of lookups
+        ruled_out = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                continue
+            x, y = self.crossword.overlaps[var, neighbor]
+            domain = self.domains[neighbor]
+            size = popcount(domain)
+            ruled_out.append((x, {
+                letter: size - popcount(
+                    domain & self.lexicon.mask(neighbor.length, y, letter)
+                )
+                for letter in self.lexicon.letters.get((var.length, x), [])
+            }))
+
+        # Shuffle first so that ties are broken at random
+        values = self.domain_words(var)
+        self.random.shuffle(values)
+        return sorted(
+            values,
+            key=lambda value: sum(counts[value[x]] for x, counts in ruled_out)
+        )
 
     def select_unassigned_variable(self, assignment):
         """
@@ -234,35 +551,19 @@ class CrosswordCreator():
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
         """
-        undetermined = set(self.domains) - set(assignment)
-        # 选择可选值最少的
-        least_available_value_count = None
-        for var in undetermined:
-            available_value_count = len(self.domains[var])
-            if least_available_value_count is None:
-                least_available_value_count = available_value_count
-            elif available_value_count < least_available_value_count:
-                least_available_value_count = available_value_count
-        available_vars = []
-        for var in undetermined:
-            available_value_count = len(self.domains[var])
-            if available_value_count == least_available_value_count:
-                available_vars.append(var)
-        if len(available_vars) == 1:
-            return available_vars[0]
-
-        # 选择度数大的
-        var_neighbor = {}
-        most_neighbor_count = None
-        for var in available_vars:
-            neighbor_count = len(self.crossword.neighbors(var))
-            var_neighbor[var] = neighbor_count
-            if most_neighbor_count is None:
-                most_neighbor_count = neighbor_count
-            elif neighbor_count > most_neighbor_count:
-                most_neighbor_count = neighbor_count
-        available_vars = [x for x in available_vars if var_neighbor[x] == most_neighbor_count]
-        return random.choice(available_vars)
+        if self.heap is None:
+            self.heap = []
+            for var in self.domains:
+                self.push(var)
+
+        # Drop entries for assigned variables and outdated domain sizes
+        while self.heap:
+            size, _, _, _, var = self.heap[0]
+            if var in assignment or size != popcount(self.domains[var]):
+                heapq.heappop(self.heap)
+            else:
+                return var
+        return None
 
     def backtrack(self, assignment):
         """
@@ -278,27 +579,256 @@ class CrosswordCreator():
         var = self.select_unassigned_variable(assignment)
         for value in self.order_domain_values(var, assignment):
             assignment[var] = value
-            if self.consistent(assignment):
-                self.backtrack(assignment)
-                if self.assignment_complete(assignment):
-                    return assignment
+            self.count_node()
+            if self.consistent(assignment, var):
+                mark = len(self.trail)
+                if self.propagate(var, assignment):
+                    result = self.backtrack(assignment)
+                    if result is not None:
+                        return result
+                self.restore(mark)
             del assignment[var]
+            self.backtracks += 1
 
         return None
 
+    def search(self, assignment):
+        """
+        Using Backtracking Search, yield every complete extension of the
+        partial assignment `assignment`. The same dict is yielded each
+        time and is updated as the search continues.
+        """
+        if self.assignment_complete(assignment):
+            yield assignment
+            return
+        var = self.select_unassigned_variable(assignment)
+        for value in self.order_domain_values(var, assignment):
+            assignment[var] = value
+            self.count_node()
+            if self.consistent(assignment, var):
+                mark = len(self.trail)
+                if self.propagate(var, assignment):
+                    yield from self.search(assignment)
+                self.restore(mark)
+            del assignment[var]
+            self.backtracks += 1
+
+    def backjump(self, assignment):
+        """
+        Using conflict-directed backjumping, take as input a partial
+        assignment and return a pair of a complete assignment, or None if
+        there is none, and the conflict set of the failure.
+
+        The conflict set is the bitset of assigned variables whose values
+        together rule out every extension of `assignment`. Levels whose
+        variable is not in it are jumped over without trying other values.
+        """
+        if self.assignment_complete(assignment):
+            return assignment, 0
+        var = self.select_unassigned_variable(assignment)
+        bit = self.bits[var]
+
+        # Values already pruned from the domain count against their causes
+        conflicts = self.explanations[var]
+        for value in self.order_domain_values(var, assignment):
+            assignment[var] = value
+            self.count_node()
+            nogood = self.nogood(assignment, var)
+            if nogood is not None:
+                conflicts |= nogood
+            elif not self.consistent(assignment, var):
+                conflicts |= sum(self.bits[v] for v in assignment)
+            else:
+                mark = len(self.trail)
+                if self.propagate(var, assignment):
+                    result, conflict = self.backjump(assignment)
+                    if result is not None:
+                        return result, 0
+                    if not conflict & bit:
+                        # This variable played no part, so jump over it
+                        self.restore(mark)
+                        del assignment[var]
+                        self.backtracks += 1
+                        return None, conflict
+                    conflicts |= conflict
+                else:
+                    conflicts |= self.conflict
+                self.restore(mark)
+            del assignment[var]
+            self.backtracks += 1
+
+        conflicts &= ~bit
+        self.learn(assignment, conflicts)
+        return None, conflicts
+
+    def learn(self, assignment, conflicts):
+        """
+        Record the values of the variables in the bitset `conflicts` as a
+        nogood, if nogood learning is on.
+        """
+        if self.nogoods is None:
+            return
+        nogood = frozenset(
+            (var, word) for var, word in assignment.items()
+            if conflicts & self.bits[var]
+        )
+        for pair in nogood:
+            self.nogoods.setdefault(pair, []).append(nogood)
+
+    def nogood(self, assignment, var):
+        """
+        Return the bitset of variables of a learned nogood that `assignment`
+        matches through the newly assigned `var`, or None if there is none.
+        """
+        if self.nogoods is None:
+            return None
+        for nogood in self.nogoods.get((var, assignment[var]), []):
+            if all(assignment.get(v) == word for v, word in nogood):
+                return sum(self.bits[v] for v, _ in nogood)
+        return None
+
+
+class Renderer():
+
+    def __init__(self, font_path=FONT_PATH, font_size=FONT_SIZE,
+                 cell_size=CELL_SIZE, cell_border=CELL_BORDER):
+        """
+        Load the font once and pre-render a tile for each letter A-Z.
+        """
+        from PIL import ImageFont
+        self.font = ImageFont.truetype(font_path, font_size)
+        self.cell_size = cell_size
+        self.cell_border = cell_border
+
+        # Tiles for a block, an empty cell and then each letter, as RGBA
+        # arrays, with the index of each letter's tile
+        self.tiles = [self.draw(None, fill="black"), self.draw(None)]
+        self.index = dict()
+        self.atlas = None
+        for letter in string.ascii_uppercase:
+            self.tile(letter)
+
+    def draw(self, letter, fill="white"):
+        """
+        Return a cell as an RGBA array: a border of black around an
+        interior of `fill`, with `letter` centred in it if given.
+        """
+        import numpy as np
+        from PIL import Image, ImageDraw
+        size = self.cell_size
+        border = self.cell_border
+        interior_size = size - 2 * border
+
+        # Draw in the lower half of a taller image, since glyphs placed
+        # above the top edge are positioned slightly differently
+        img = Image.new("RGBA", (size, 2 * size), "black")
+        draw = ImageDraw.Draw(img)
+        draw.rectangle(
+            [(border, size + border), (size - border, 2 * size - border)],
+            fill=fill
+        )
+        if letter:
+            _, _, w, h = draw.textbbox((0, 0), letter, font=self.font)
+            draw.text(
+                (border + ((interior_size - w) / 2),
+                 size + border + ((interior_size - h) / 2) - 10),
+                letter, fill="black", font=self.font
+            )
+        return np.asarray(img)[size:]
+
+    def tile(self, letter):
+        """
+        Return the index of the tile for `letter`, rendering it if needed.
+        """
+        if letter not in self.index:
+            self.index[letter] = len(self.tiles)
+            self.tiles.append(self.draw(letter))
+            self.atlas = None
+        return self.index[letter]
+
+    def render(self, structure, letters):
+        """
+        Return an image of a crossword with the given `structure` of
+        open cells and grid of `letters`, composed from tiles in one
+        array operation.
+        """
+        import numpy as np
+        from PIL import Image
+        if self.atlas is None:
+            self.atlas = np.stack(self.tiles)
+
+        # Tile index of every cell, then the tiles laid out row by row
+        height, width = len(structure), len(structure[0])
+        cells = np.zeros((height, width), dtype=np.intp)
+        for i in range(height):
+            for j in range(width):
+                if structure[i][j]:
+                    letter = letters[i][j]
+                    cells[i, j] = self.index[letter] if letter else 1
+        size = self.cell_size
+        pixels = self.atlas[cells].transpose(0, 2, 1, 3, 4)
+        return Image.fromarray(
+            pixels.reshape(height * size, width * size, 4), "RGBA"
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_renderer(font_path=FONT_PATH, font_size=FONT_SIZE,
+                 cell_size=CELL_SIZE, cell_border=CELL_BORDER):
+    """
+    Return the shared Renderer for the given settings.
+    """
+    return Renderer(font_path, font_size, cell_size, cell_border)
+
+
+def luby(i):
+    """
+    Return the `i`th term, counting from 1, of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    if i == (1 << k) - 1:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+# Crossword and cancellation event of a portfolio worker process
+worker_crossword = None
+worker_cancel = None
+
+
+def init_worker(crossword, cancel):
+    """
+    Set up a portfolio worker process.
+    """
+    global worker_crossword, worker_cancel
+    worker_crossword = crossword
+    worker_cancel = cancel
+
+
+def run_restarts(strategy, seed, unit):
+    """
+    Solve the worker's crossword with randomized restarts.
+    """
+    creator = CrosswordCreator(worker_crossword)
+    return creator.solve_restarts(strategy, seed, unit, worker_cancel)
+
 
 def main():
     # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python generate.py structure words [output] [cache]")
 
     # Parse command-line arguments
     structure = sys.argv[1]
     words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    output = sys.argv[3] if len(sys.argv) >= 4 and sys.argv[3] else None
+    cache = sys.argv[4] if len(sys.argv) == 5 else None
 
     # Generate crossword
-    crossword = Crossword(structure, words)
+    crossword = Crossword(structure, words, cache)
     creator = CrosswordCreator(crossword)
     assignment = creator.solve()
 
@@ -0,0 +1,49 @@
+import pickle
+
+import pytest
+
+import crossword
+from crossword import Crossword
+
+STRUCTURE = "___\n_#_\n___\n"
+WORDS = "CAT\nTAB\nCOB\nBAT\n"
+
+
+@pytest.mark.parametrize("contents", [
+    b"cmissing_module\nThing\n.",
+    b"cos\nmissing_function\n.",
+    pickle.dumps("not a pair"),
+    pickle.dumps((1, 2, 3)),
+    b"not a pickle",
+])
+def test_unreadable_structure_cache_is_rebuilt(tmp_path, contents):
+    structure = tmp_path / "structure.txt"
+    words = tmp_path / "words.txt"
+    structure.write_text(STRUCTURE)
+    words.write_text(WORDS)
+    cache = tmp_path / "cache"
+    expected = Crossword(structure, words)
+
+    path = crossword.cache_path(structure, cache, ".pickle")
+    cache.mkdir()
+    with open(path, "wb") as f:
+        f.write(contents)
+    cached = Crossword(structure, words, cache)
+    assert cached.variables == expected.variables
+    assert crossword.load_cached(path, structure) is not None
+
+
+def test_structure_cache_from_another_version_is_rebuilt(tmp_path, monkeypatch):
+    structure = tmp_path / "structure.txt"
+    words = tmp_path / "words.txt"
+    structure.write_text(STRUCTURE)
+    words.write_text(WORDS)
+    cache = tmp_path / "cache"
+    path = crossword.cache_path(structure, cache, ".pickle")
+    Crossword(structure, words, cache)
+    assert crossword.load_cached(path, structure) is not None
+
+    monkeypatch.setattr(crossword, "CACHE_VERSION", crossword.CACHE_VERSION + 1)
+    assert crossword.load_cached(path, structure) is None
+    Crossword(structure, words, cache)
+    assert crossword.load_cached(path, structure) is not None
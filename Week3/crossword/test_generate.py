@@ -0,0 +1,167 @@
+import itertools
+import random
+
+import pytest
+
+from crossword import Crossword
+from generate import CrosswordCreator, SearchLimit
+
+STRATEGIES = [
+    ("chronological", False),
+    ("backjumping", False),
+    ("backjumping", True),
+]
+
+
+def random_crossword(tmp_path, seed):
+    """
+    Write a small random structure and word list to `tmp_path` and
+    return the Crossword, with few enough candidate assignments to check
+    them all.
+    """
+    rng = random.Random(seed)
+    while True:
+        height, width = rng.randint(2, 4), rng.randint(2, 4)
+        rows = [
+            "".join("_" if rng.random() < 0.7 else "#" for _ in range(width))
+            for _ in range(height)
+        ]
+        words = {
+            "".join(rng.choice("ABC") for _ in range(length))
+            for length in range(2, 5)
+            for _ in range(rng.randint(3, 8))
+        }
+        (tmp_path / "structure.txt").write_text("\n".join(rows))
+        (tmp_path / "words.txt").write_text("\n".join(sorted(words)))
+        crossword = Crossword(tmp_path / "structure.txt", tmp_path / "words.txt")
+        candidates = 1
+        for var in crossword.variables:
+            candidates *= sum(len(word) == var.length for word in words)
+        if crossword.variables and candidates <= 20000:
+            return crossword
+
+
+def brute_force(crossword):
+    """
+    Return every solution of `crossword` as a frozenset of (variable,
+    word) pairs, by trying every combination of words.
+    """
+    variables = sorted(crossword.variables, key=lambda v: (v.i, v.j, v.direction))
+    choices = [
+        [word for word in crossword.words if len(word) == var.length]
+        for var in variables
+    ]
+    solutions = set()
+    for words in itertools.product(*choices):
+        if len(set(words)) != len(words):
+            continue
+        assignment = dict(zip(variables, words))
+        if all(
+            assignment[x][i] == assignment[y][j]
+            for (x, y), overlap in crossword.overlaps.items()
+            if overlap is not None
+            for i, j in [overlap]
+        ):
+            solutions.add(frozenset(assignment.items()))
+    return solutions
+
+
+def check(result, solutions):
+    if solutions:
+        assert result is not None
+        assert frozenset(result.items()) in solutions
+    else:
+        assert result is None
+
+
+@pytest.mark.parametrize("seed", range(90))
+def test_solve_matches_brute_force(tmp_path, seed):
+    crossword = random_crossword(tmp_path, seed)
+    solutions = brute_force(crossword)
+    for strategy, nogoods in STRATEGIES:
+        creator = CrosswordCreator(crossword)
+        check(creator.solve(strategy, nogoods), solutions)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_solve_restarts_matches_brute_force(tmp_path, seed):
+    crossword = random_crossword(tmp_path, seed)
+    solutions = brute_force(crossword)
+    for strategy in ["chronological", "backjumping"]:
+        creator = CrosswordCreator(crossword)
+        check(creator.solve_restarts(strategy, seed=seed, unit=1), solutions)
+
+
+def test_search_limit_is_raised(tmp_path):
+    crossword = random_crossword(tmp_path, 0)
+    creator = CrosswordCreator(crossword)
+    creator.limit = 0
+    with pytest.raises(SearchLimit):
+        creator.solve()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_portfolio_matches_brute_force(tmp_path, seed):
+    crossword = random_crossword(tmp_path, seed)
+    check(CrosswordCreator(crossword).portfolio(workers=2, unit=1),
+          brute_force(crossword))
+
+
+@pytest.mark.parametrize("seed", range(90))
+def test_solutions_match_brute_force(tmp_path, seed):
+    crossword = random_crossword(tmp_path, seed)
+    solutions = brute_force(crossword)
+    found = [
+        frozenset(assignment.items())
+        for assignment in CrosswordCreator(crossword).solutions()
+    ]
+    assert len(found) == len(set(found))
+    assert set(found) == solutions
+
+    limited = list(CrosswordCreator(crossword).solutions(limit=2))
+    assert len(limited) == min(2, len(solutions))
+    assert all(frozenset(a.items()) in solutions for a in limited)
+
+
+@pytest.mark.parametrize("seed", range(90))
+@pytest.mark.parametrize("distinct", [True, "words"])
+def test_distinct_solutions_share_no_words(tmp_path, seed, distinct):
+    crossword = random_crossword(tmp_path, seed)
+    solutions = brute_force(crossword)
+    used = set()
+    for assignment in CrosswordCreator(crossword).solutions(distinct=distinct):
+        assert frozenset(assignment.items()) in solutions
+        assert used.isdisjoint(assignment.values())
+        used.update(assignment.values())
+
+    # Every solution left over reuses some word
+    for solution in solutions:
+        assert not used.isdisjoint(word for _, word in solution)
+
+
+@pytest.mark.parametrize("seed", range(90))
+def test_distinct_word_sets_match_brute_force(tmp_path, seed):
+    crossword = random_crossword(tmp_path, seed)
+    solutions = brute_force(crossword)
+    creator = CrosswordCreator(crossword)
+    creator.random = random.Random(seed)
+    found = []
+    for assignment in creator.solutions(distinct="sets"):
+        assert frozenset(assignment.items()) in solutions
+        found.append(frozenset(assignment.values()))
+    assert len(found) == len(set(found))
+    assert set(found) == {
+        frozenset(word for _, word in solution) for solution in solutions
+    }
+
+    # The search carries on past repeats rather than restarting
+    plain = CrosswordCreator(crossword)
+    plain.random = random.Random(seed)
+    list(plain.solutions())
+    assert creator.nodes == plain.nodes
+
+
+def test_unknown_distinct_mode(tmp_path):
+    creator = CrosswordCreator(random_crossword(tmp_path, 0))
+    with pytest.raises(ValueError):
+        next(creator.solutions(distinct="letters"))